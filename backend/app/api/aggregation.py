@@ -1,18 +1,60 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.models.user import User
+from backend.app.schemas.user import CurrentUser
 from backend.app.services.auth import get_current_user
-from backend.app.db.session import get_db
-from backend.app.schemas.aggregation import AvgRating, TopDestinationPerMonth
-from backend.app.services.aggregation import avg_rating_by_country, top_destination_per_month
+from backend.app.db.instrumentation import query_budget
+from backend.app.db.session import get_async_db
+from backend.app.schemas.aggregation import AvgRating, StatsResponse, TopDestinationPerMonth
+from backend.app.services.aggregation import (
+    STAT_DIMENSIONS, STAT_METRICS, avg_rating_by_country, canonical_grouping, grouped_stats, top_destination_per_month,
+)
+from backend.app.services.cache import conditional_get
 
-router = APIRouter(tags=["Aggregations"])
+router = APIRouter(tags=["Aggregations"], default_response_class=ORJSONResponse)
 
-@router.get("/avg-rating-by-country", response_model=list[AvgRating])
-def get_avg_by_country(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return avg_rating_by_country(db, user.id)
+@router.get("/avg-rating-by-country", response_model=list[AvgRating], dependencies=[Depends(query_budget(2))])
+async def get_avg_by_country(request: Request, response: Response, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await conditional_get(request, response, user.id, lambda: avg_rating_by_country(db, user.id))
 
-@router.get("/top-destination-per-month", response_model=list[TopDestinationPerMonth])
-def get_top_per_month(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return top_destination_per_month(db, user.id)
\ No newline at end of file
+@router.get("/top-destination-per-month", response_model=list[TopDestinationPerMonth], dependencies=[Depends(query_budget(2))])
+async def get_top_per_month(request: Request, response: Response, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await conditional_get(request, response, user.id, lambda: top_destination_per_month(db, user.id))
+
+MAX_GROUPINGS = 8
+
+def parse_groupings(group_by: list[str]) -> list[tuple[str, ...]]:
+    groupings = []
+    for spec in group_by:
+        grouping = () if spec == "total" else tuple(dict.fromkeys(d.strip() for d in spec.split(",") if d.strip()))
+        unknown = [d for d in grouping if d not in STAT_DIMENSIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"unknown dimensions: {', '.join(unknown)}")
+        groupings.append(canonical_grouping(grouping))
+    groupings = list(dict.fromkeys(groupings))
+    if len(groupings) > MAX_GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_GROUPINGS} groupings")
+    return groupings
+
+@router.get("/stats", response_model=StatsResponse, dependencies=[Depends(query_budget(2))])
+async def get_stats(
+    request: Request,
+    response: Response,
+    group_by: list[str] = Query(
+        ..., description=f"Repeat for several groupings; each is comma-separated dimensions ({', '.join(STAT_DIMENSIONS)}) or 'total'",
+    ),
+    metrics: str = Query(default="count,avg_rating", description=f"Comma-separated, from {', '.join(STAT_METRICS)}"),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    groupings = parse_groupings(group_by)
+    selected = list(dict.fromkeys(m.strip() for m in metrics.split(",") if m.strip()))
+    unknown = [m for m in selected if m not in STAT_METRICS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"unknown metrics: {', '.join(unknown)}" if unknown else "no metrics")
+
+    async def load():
+        return orjson.dumps({"groupings": await grouped_stats(db, user.id, groupings, selected)})
+    return await conditional_get(request, response, user.id, load)
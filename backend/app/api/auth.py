@@ -1,37 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.app.models.user import User
 from backend.app.schemas.user import UserCreate, UserLogin, UserInfo
-from backend.app.db.session import get_db
-from backend.app.services.auth import hash_password, verify_password, create_access_token
+from backend.app.db.session import get_async_db
+from backend.app.services.auth import authenticate, hash_password_async, create_access_token
 
 router = APIRouter(tags=["Auth"])
 
 @router.post("/signup", response_model=UserInfo)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.scalars(select(User).where(User.email == user.email).limit(1))).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_pw = hash_password(user.password)
 
     new_user = User(
         name=user.name,
         email=user.email,
-        hashed_password=hash_password(user.password)
+        hashed_password=await hash_password_async(user.password)
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return new_user
 
 # JSON login for frontend verification
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.hashed_password): # type: ignore
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await authenticate(db, user.email, user.password)
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": str(db_user.id), "email": db_user.email})
     return {"access_token": token, "token_type": "bearer"}
@@ -40,9 +40,9 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 
 # OAuth2 login for OpenAPI
 @router.post("/token")
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == form_data.username).first()
-    if not db_user or not verify_password(form_data.password, db_user.hashed_password): # type: ignore
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    db_user = await authenticate(db, form_data.username, form_data.password)
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": str(db_user.id)})
-    return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": token, "token_type": "bearer"}
@@ -0,0 +1,35 @@
+from typing import Annotated
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.db.instrumentation import query_budget
+from backend.app.db.session import get_async_db
+from backend.app.schemas.map import Cluster
+from backend.app.schemas.user import CurrentUser
+from backend.app.services.auth import get_current_user
+from backend.app.services.cache import conditional_get
+from backend.app.services.clusters import clusters_in_box
+
+router = APIRouter(tags=["Map"], default_response_class=ORJSONResponse)
+
+# Up to two statements when the box wraps the antimeridian, plus the principal lookup on a cache miss
+@router.get("/clusters", response_model=list[Cluster], dependencies=[Depends(query_budget(3))])
+async def get_clusters(
+    request: Request,
+    response: Response,
+    min_lat: Annotated[float, Query(ge=-90, le=90)],
+    max_lat: Annotated[float, Query(ge=-90, le=90)],
+    min_lon: Annotated[float, Query(ge=-180, le=180, description="Greater than max_lon when the box wraps the antimeridian")],
+    max_lon: Annotated[float, Query(ge=-180, le=180)],
+    zoom: Annotated[int, Query(ge=0, le=22)],
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    async def load():
+        try:
+            clusters = await clusters_in_box(db, user.id, min_lat, max_lat, min_lon, max_lon, zoom)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return orjson.dumps(clusters)
+    return await conditional_get(request, response, user.id, load)
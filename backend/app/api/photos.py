@@ -1,65 +1,163 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from sqlalchemy.orm import Session
-from backend.app.db.session import get_db
-from backend.app.schemas.photos import PhotoRead
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.db.instrumentation import query_budget
+from backend.app.db.session import AsyncSessionLocal, get_async_db
+from backend.app.schemas.photos import DERIVATIVE_SIZES, PhotoRead, PhotoUsage, derivative_paths, photo_payload, photo_version
 from backend.app.services.auth import get_current_user
 from backend.app.models.travel_record import TravelRecord
-from backend.app.services.photo import save_upload
-from backend.app.models.user import User
+from backend.app.services.photo import (
+    MAX_REQUEST_BYTES, file_response, generate_derivatives, has_derivatives, multipart_file_chunks, save_upload, settle_upload,
+)
+from backend.app.services.cache import bump_data_version, etag_matches
+from backend.app.services.photo_blob import register_orphan, release_refs, replace_ref, usage_statement
+from backend.app.schemas.user import CurrentUser
 
 router = APIRouter(prefix="/records", tags=["photos"])
+usage_router = APIRouter(tags=["photos"])
 
-@router.post("/{record_id}/photo", response_model=PhotoRead)
+async def process_derivatives(path: str, statuses: tuple[str, ...] = ("pending",)) -> None:
+    # Runs after the upload response is sent; every record pointing at this blob gets the outcome
+    ok = await generate_derivatives(path)
+    async with AsyncSessionLocal() as db:
+        statement = (
+            update(TravelRecord)
+            .where(TravelRecord.photo_path == path, TravelRecord.photo_status.in_(statuses))
+            .values(photo_status="ready" if ok else "failed")
+            .returning(TravelRecord.user_id)
+        )
+        user_ids = set((await db.scalars(statement)).all())
+        await db.commit()
+    for user_id in user_ids:
+        bump_data_version(user_id)
+
+def _set_photo(user_id: int, record_id: int, **values):
+    """
+    UPDATE of the record's photo fields RETURNING the previous photo_path (snapshot via UPDATE ... FROM),
+    so the old blob's reference can be released without loading the record first.
+    """
+    old = (
+        select(TravelRecord.id, TravelRecord.photo_path)
+        .where(TravelRecord.id == record_id, TravelRecord.user_id == user_id)
+        .with_for_update()
+        .subquery("old")
+    )
+    return update(TravelRecord).where(TravelRecord.id == old.c.id).values(**values).returning(old.c.photo_path)
+
+# The body is parsed by the handler itself (declaring File(...) would have Starlette receive and spool the
+# whole request before the handler runs), so the multipart schema is documented by hand
+UPLOAD_BODY = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}},
+}}}}}
+
+@router.post("/{record_id}/photo", response_model=PhotoRead, dependencies=[Depends(query_budget(4))], openapi_extra=UPLOAD_BODY)
 async def upload_record_photo(
     record_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    rec = (
-        db.query(TravelRecord)
-        .filter(TravelRecord.id == record_id, TravelRecord.user_id == user.id)
-        .first()
-    )
-    if not rec:
-        raise HTTPException(status_code=404, detail="Record not found")
+    # Oversized bodies are refused from the headers alone; the rest is checked chunk by chunk as it arrives
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_REQUEST_BYTES:
+        raise HTTPException(status_code=400, detail="file_too_large")
 
+    # Stored before the record is known to exist (no separate ownership query); on a 404 the blob is
+    # registered as an orphan so the regular GC run collects it
     try:
-        path, ctype, size = await save_upload(file)
+        chunks = multipart_file_chunks(request.stream(), request.headers.get("content-type", ""))
+        path, ctype, size, spare = await save_upload(chunks)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    # Replace 1:1
-    rec.photo_path = path
-    rec.photo_content_type = ctype
-    rec.photo_size_bytes = size
-    db.commit()
-    db.refresh(rec)
-
-    # Build PhotoRead
-    return {
-        "id": rec.id,
-        "file_path": rec.photo_path,
-        "content_type": rec.photo_content_type,
-        "size_bytes": rec.photo_size_bytes,
-    }
-
-@router.delete("/{record_id}/photo", status_code=204)
-def delete_record_photo(
+    try:
+        # Replace 1:1; identical content uploaded before already has its derivatives
+        status = "ready" if has_derivatives(path) else "pending"
+        statement = _set_photo(user.id, record_id, photo_path=path, photo_content_type=ctype, photo_size_bytes=size, photo_status=status)
+        row = (await db.execute(statement)).first()
+        if not row:
+            await db.run_sync(register_orphan, path, ctype, size)
+            await db.commit()
+            raise HTTPException(status_code=404, detail="Record not found")
+        # The previous blob loses a reference and becomes collectable once nothing else uses it
+        await db.run_sync(replace_ref, row.photo_path, path, ctype, size)
+        await db.commit()
+    finally:
+        restored = await settle_upload(path, spare)
+    bump_data_version(user.id)
+
+    if restored:
+        # Collected (with its derivatives) while this upload was in flight: regenerate even if marked ready
+        background_tasks.add_task(process_derivatives, path, ("pending", "ready"))
+    elif status == "pending":
+        background_tasks.add_task(process_derivatives, path)
+
+    return photo_payload(record_id, path, ctype, size, status)
+
+@router.delete("/{record_id}/photo", status_code=204, dependencies=[Depends(query_budget(3))])
+async def delete_record_photo(
     record_id: int,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
-    rec = (
-        db.query(TravelRecord)
-        .filter(TravelRecord.id == record_id, TravelRecord.user_id == user.id)
-        .first()
-    )
-    if not rec:
+    # clear DB fields; the file stays on disk until gc_photos finds it unreferenced
+    statement = _set_photo(user.id, record_id, photo_path=None, photo_content_type=None, photo_size_bytes=None, photo_status=None)
+    row = (await db.execute(statement)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Record not found")
+    if row.photo_path:
+        await db.run_sync(release_refs, [row.photo_path])
+    await db.commit()
+    bump_data_version(user.id)
 
-    # clear DB fields, keeps file on disk for simplicity
-    rec.photo_path = None
-    rec.photo_content_type = None
-    rec.photo_size_bytes = None
-    db.commit()
+# The record URL keeps its address when the photo is replaced, so a bare request must revalidate (cheap 304
+# on the strong ETag); only a request carrying the current content hash as ?v= is cached as immutable
+PHOTO_CACHE_CONTROL = "private, no-cache"
+VERSIONED_PHOTO_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+@router.get("/{record_id}/photo", response_class=Response, dependencies=[Depends(query_budget(2))])
+async def serve_record_photo(
+    record_id: int,
+    request: Request,
+    size: int | None = Query(default=None, description=f"Derivative size, one of {DERIVATIVE_SIZES}"),
+    v: str | None = Query(default=None, description="Content version from PhotoRead.url"),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    statement = (
+        select(TravelRecord.photo_path, TravelRecord.photo_content_type, TravelRecord.photo_status)
+        .where(TravelRecord.id == record_id, TravelRecord.user_id == user.id)
+        .limit(1)
+    )
+    row = (await db.execute(statement)).first()
+    if not row or not row.photo_path:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    path, ctype = row.photo_path, row.photo_content_type or "application/octet-stream"
+    cache_control = VERSIONED_PHOTO_CACHE_CONTROL if v == photo_version(path) else PHOTO_CACHE_CONTROL
+    if size is not None:
+        if size not in DERIVATIVE_SIZES:
+            raise HTTPException(status_code=400, detail=f"size must be one of {DERIVATIVE_SIZES}")
+        if row.photo_status != "ready":
+            raise HTTPException(status_code=404, detail="Photo derivative not ready")
+        path, ctype = derivative_paths(path)[size], "image/webp"
+
+    # Strong ETag straight from the content-addressed name, answered without touching the disk
+    etag = f'"{photo_version(path)}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        return file_response(path, ctype, request.headers.get("range"), headers)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+@usage_router.get("/usage", response_model=PhotoUsage, dependencies=[Depends(query_budget(1))])
+async def photo_usage(
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    row = (await db.execute(usage_statement(user.id))).first()
+    return PhotoUsage(files=row.files if row else 0, bytes=row.bytes if row else 0)
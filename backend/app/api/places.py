@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from backend.app.models.user import User
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.db.instrumentation import query_budget
+from backend.app.db.session import get_async_db
+from backend.app.schemas.user import CurrentUser
 from backend.app.services.auth import get_current_user
-from backend.app.services.google_maps import autocomplete, place_details, PlacesError
+from backend.app.services.google_maps import autocomplete, PlacesError, PlacesUnavailable
+from backend.app.services.places import cached_place_details
 
 router = APIRouter(tags=["Places"])
 
@@ -9,19 +13,25 @@ router = APIRouter(tags=["Places"])
 async def places_autocomplete(
     q: str = Query(..., min_length=1, description="Free-text search"),
     session_token: str | None = Query(None, description="Optional Places session token"),
-    user: User = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
 ):
     try:
         return await autocomplete(q, session_token)
+    except PlacesUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except PlacesError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/details")
+# Cache hit: one primary-key lookup; miss or stale: lookup + upsert
+@router.get("/details", dependencies=[Depends(query_budget(2))])
 async def places_details(
     place_id: str = Query(..., description="Google Place ID"),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
     try:
-        return await place_details(place_id)
+        return await cached_place_details(db, place_id)
+    except PlacesUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except PlacesError as e:
         raise HTTPException(status_code=400, detail=str(e))
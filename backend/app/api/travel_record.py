@@ -1,43 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from typing import Literal
+import orjson
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.app.db.session import get_db
-from backend.app.models.user import User
+from backend.app.db.instrumentation import query_budget
+from backend.app.db.session import get_async_db
+from backend.app.schemas.user import CurrentUser
 from backend.app.services import travel_record
-from backend.app.schemas.travel_record import RecordFilters, RecordsPage, TravelRecordCreate, TravelRecordRead, TravelRecordUpdate
+from backend.app.services.record_export import MEDIA_TYPES, export_records
+from backend.app.services.record_import import import_records
+from backend.app.schemas.travel_record import (
+    BatchResult, BatchSelection, BatchUpdate, ImportReport, RecordFilters, RecordsPage,
+    TravelRecordCreate, TravelRecordRead, TravelRecordUpdate, parse_fields, partial_record_model,
+)
 from backend.app.services.auth import get_current_user
+from backend.app.services.cache import conditional_get
 
-router = APIRouter(tags=["Records"])
+router = APIRouter(tags=["Records"], default_response_class=ORJSONResponse)
 
-@router.post("/", response_model=TravelRecordRead)
-def create_record(payload: TravelRecordCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return travel_record.create_record(db, user.id, payload)
+# Write budgets are the Postgres worst case (asserted in backend/tests/test_write_queries.py): the record
+# statement, the summary-table upkeep in the same transaction (services.aggregation.apply_record_changes:
+# one country upsert, then lock + best-of-month upsert per touched month and a DELETE for a month left
+# empty), the photo reference release on delete, plus the principal lookup on an auth cache miss
 
-@router.get("/{record_id}", response_model=TravelRecordRead)
-def read_record(record_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    rec = travel_record.get_record(db, user.id, record_id)
-    if not rec:
-        raise HTTPException(status_code=404, detail="Record not found")
-    return rec
+FIELDS_QUERY = Query(default=None, description="Comma-separated TravelRecordRead fields to return (id is always included), e.g. title,latitude,longitude,rating")
+
+def requested_fields(fields: str | None) -> tuple[str, ...] | None:
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/", response_model=TravelRecordRead, dependencies=[Depends(query_budget(5))])
+async def create_record(payload: TravelRecordCreate, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await travel_record.create_record(db, user.id, payload)
+
+@router.post("/import", response_model=ImportReport)
+async def bulk_import(
+    file: UploadFile = File(..., description="NDJSON (one TravelRecordCreate per line) or CSV with a header row"),
+    format: Literal["ndjson", "csv"] | None = Query(default=None, description="Defaults from the file name / content type"),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    if format is None:
+        is_csv = (file.filename or "").lower().endswith(".csv") or file.content_type == "text/csv"
+        format = "csv" if is_csv else "ndjson"
+    return await import_records(db, user.id, file.file, format)
+
+@router.post("/batch-update", response_model=BatchResult)
+async def batch_update(payload: BatchUpdate, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    try:
+        return BatchResult(affected=await travel_record.batch_update(db, user.id, payload))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/batch-delete", response_model=BatchResult)
+async def batch_delete(payload: BatchSelection, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    try:
+        return BatchResult(affected=await travel_record.batch_delete(db, user.id, payload))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Declared before /{record_id} so "export" isn't taken for an id
+@router.get("/export", response_class=StreamingResponse)
+async def export(
+    format: Literal["ndjson", "csv", "geojson"] = Query(default="ndjson"),
+    user: CurrentUser = Depends(get_current_user),
+):
+    return StreamingResponse(
+        export_records(user.id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="travel_records.{format}"'},
+    )
+
+@router.get("/{record_id}", response_model=TravelRecordRead, dependencies=[Depends(query_budget(2))])
+async def read_record(
+    record_id: int,
+    request: Request,
+    response: Response,
+    fields: str | None = FIELDS_QUERY,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    selected = requested_fields(fields)
+    async def load():
+        if selected is None:
+            rec = await travel_record.get_record(db, user.id, record_id)
+            if not rec:
+                raise HTTPException(status_code=404, detail="Record not found")
+            return TravelRecordRead.model_validate(rec)
+        item = await travel_record.get_record_fields(db, user.id, record_id, selected)
+        if not item:
+            raise HTTPException(status_code=404, detail="Record not found")
+        # Partial model instead of TravelRecordRead, sent as encoded bytes so response_model doesn't demand the rest
+        return partial_record_model(selected).model_validate(item).model_dump_json().encode()
+    return await conditional_get(request, response, user.id, load)
 
-@router.patch("/{record_id}", response_model=TravelRecordRead)
-def update_record(record_id: int, payload: TravelRecordUpdate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    rec = travel_record.update_record(db, user.id, record_id, payload)
+@router.patch("/{record_id}", response_model=TravelRecordRead, dependencies=[Depends(query_budget(8))])
+async def update_record(record_id: int, payload: TravelRecordUpdate, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    rec = await travel_record.update_record(db, user.id, record_id, payload)
     if not rec:
         raise HTTPException(status_code=404, detail="Record not found")
     return rec
 
-@router.delete("/{record_id}", status_code=204)
-def delete_record(record_id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    ok = travel_record.delete_record(db, user.id, record_id)
+@router.delete("/{record_id}", status_code=204, dependencies=[Depends(query_budget(7))])
+async def delete_record(record_id: int, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    ok = await travel_record.delete_record(db, user.id, record_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Record not found")
     return
 
-@router.get("/", response_model=RecordsPage)
-def list_records(
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+@router.get("/", response_model=RecordsPage, dependencies=[Depends(query_budget(3))])
+async def list_records(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
     q: str | None = Query(default=None),
     country_code: str | None = None,
     region: str | None = None,
@@ -47,15 +126,30 @@ def list_records(
     rating_max: int | None = None,
     date_from: str | None = None,
     date_to: str | None = None,
+    near_lat: float | None = None,
+    near_lon: float | None = None,
+    near_km: float | None = None,
     order_by: str = "visited_at:desc",
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+    with_total: Literal["false", "exact", "estimate"] = Query(default="exact", description="Skip, compute or estimate the total"),
+    fields: str | None = FIELDS_QUERY,
 ):
+    selected = requested_fields(fields)
     filters = RecordFilters(
         q=q, country_code=country_code, region=region, city=city, dest_type=dest_type, # type: ignore
         rating_min=rating_min, rating_max=rating_max,
         date_from=date_from, date_to=date_to, # type: ignore
-        order_by=order_by, limit=limit, offset=offset
+        near_lat=near_lat, near_lon=near_lon, near_km=near_km,
+        order_by=order_by, limit=limit, offset=offset, cursor=cursor, with_total=with_total
     )
-    items, total = travel_record.search_records(db, user.id, filters)
-    return {"items": items, "total": total, "limit": limit, "offset": offset}
+    async def load():
+        try:
+            items, total, next_cursor = await travel_record.search_records(db, user.id, filters, selected)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Rows are already in TravelRecordRead (or partial_record_model) shape: encode the whole page in one orjson pass
+        page = {"items": items, "total": total, "limit": limit, "offset": offset, "next_cursor": next_cursor}
+        return orjson.dumps(page, option=orjson.OPT_NON_STR_KEYS)
+    return await conditional_get(request, response, user.id, load)
@@ -0,0 +1,31 @@
+"""
+Garbage-collect unreferenced photo blobs and report photo storage per user.
+
+    python -m backend.app.commands.gc_photos [--grace-hours H] [--batch-size N] [--adopt-unreferenced] [--report]
+"""
+import argparse
+from datetime import timedelta
+from backend.app.db.session import SessionLocal
+from backend.app.models import user, travel_record # noqa: F401  register mappers
+from backend.app.services.photo_blob import adopt_unreferenced_files, collect_garbage, usage_statement
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--grace-hours", type=float, default=24, help="Only delete blobs unreferenced for this long")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--adopt-unreferenced", action="store_true", help="First register untracked files in MEDIA_ROOT as orphans")
+    parser.add_argument("--report", action="store_true", help="Print files/bytes per user instead of collecting")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.report:
+            for user_id, files, total in db.execute(usage_statement()).all():
+                print(f"user={user_id} files={files} bytes={total}")
+            return
+        if args.adopt_unreferenced:
+            print(f"adopted {adopt_unreferenced_files(db)} untracked files")
+        files, freed = collect_garbage(db, timedelta(hours=args.grace_hours), args.batch_size)
+        print(f"removed {files} blobs, freed {freed} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Backfill or repair the per-user aggregation tables from travel_records.
+
+    python -m backend.app.commands.rebuild_aggregates [--user-id ID]
+"""
+import argparse
+from backend.app.db.session import SessionLocal
+from backend.app.models import user, travel_record # noqa: F401  register mappers
+from backend.app.services.aggregation import rebuild_user_aggregates
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user (default: everyone)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rebuild_user_aggregates(db, args.user_id)
+        db.commit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Fill the place-details cache for every place referenced by travel records (missing or stale entries only).
+
+    python -m backend.app.commands.warm_place_details [--limit N] [--concurrency N]
+"""
+import argparse, asyncio
+from backend.app.db.session import AsyncSessionLocal
+from backend.app.models import user, travel_record # noqa: F401  register mappers
+from backend.app.services.google_maps import close_places_client
+from backend.app.services.places import warm_place_details
+
+async def run(limit: int | None, concurrency: int) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            stored, failed = await warm_place_details(db, limit, concurrency)
+        print(f"cached {stored} places, {failed} failed")
+    finally:
+        await close_places_client()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=None, help="At most this many places")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel upstream requests")
+    args = parser.parse_args()
+    asyncio.run(run(args.limit, args.concurrency))
+
+if __name__ == "__main__":
+    main()
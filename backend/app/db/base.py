@@ -1,3 +1,26 @@
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+class PostgresSQL(ColumnElement):
+    """
+    Raw SQL rendered as-is on Postgres and as NULL elsewhere. Used for generated columns whose expression
+    is Postgres-only: on SQLite the table can still be created, the column just stays empty and the
+    services use their non-Postgres fallbacks.
+    """
+    inherit_cache = True
+    _traverse_internals = [("sql", InternalTraversal.dp_string)]
+
+    def __init__(self, sql: str):
+        self.sql = sql
+
+@compiles(PostgresSQL)
+def _render_elsewhere(element, compiler, **kw):
+    return "NULL"
+
+@compiles(PostgresSQL, "postgresql")
+def _render_postgres(element, compiler, **kw):
+    return element.sql
@@ -0,0 +1,134 @@
+import contextvars, logging, time
+from dataclasses import dataclass
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.env import SQL_QUERY_BUDGET_STRICT
+
+logger = logging.getLogger("backend.sql")
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_sql: str | None = None
+    budget: int | None = None
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def server_timing(self, app_ms: float) -> str:
+        return (
+            f'db;dur={self.total_ms:.1f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_ms:.1f}, "
+            f"app;dur={app_ms:.1f}"
+        )
+
+# Stats for the request being handled; the object is shared by reference with threadpool/greenlet children
+_current: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("sql_query_stats", default=None)
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Times every statement on `engine` (pass AsyncEngine.sync_engine for async engines).
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, (time.perf_counter() - started) * 1000)
+
+def query_budget(max_queries: int):
+    """
+    Route dependency declaring how many statements a request may run, e.g.
+    `dependencies=[Depends(query_budget(3))]`. Over budget is logged; with SQL_QUERY_BUDGET_STRICT=1 the request
+    is answered with a 500 instead (when the budget is already exceeded as the response starts).
+    """
+    async def _declare() -> None:
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = max_queries
+    return _declare
+
+class QueryStatsMiddleware:
+    """
+    Collects per-request SQL stats, adds them as Server-Timing headers and logs one line per request.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        failed = False
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal failed
+            if message["type"] == "http.response.start":
+                timing = stats.server_timing((time.perf_counter() - started) * 1000)
+                if stats.over_budget and SQL_QUERY_BUDGET_STRICT:
+                    # Checked before anything is sent, so the guard can replace the response with a 500
+                    failed = True
+                    await send({
+                        "type": "http.response.start",
+                        "status": 500,
+                        "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"server-timing", timing.encode())],
+                    })
+                    await send({"type": "http.response.body", "body": _budget_message(scope, stats).encode()})
+                    return
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timing)
+            elif failed:
+                return # the original body is dropped
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "queries": stats.count,
+            "db_ms": round(stats.total_ms, 1),
+            "slowest_ms": round(stats.slowest_ms, 1),
+            "slowest_sql": stats.slowest_sql,
+            "app_ms": round(elapsed_ms, 1),
+            "query_budget": stats.budget,
+        }
+        logger.info(
+            "%s %s queries=%d db_ms=%.1f slowest_ms=%.1f app_ms=%.1f",
+            scope["method"], scope["path"], stats.count, stats.total_ms, stats.slowest_ms, elapsed_ms,
+            extra={"sql": fields},
+        )
+        if stats.over_budget and not failed:
+            # Streaming bodies and background tasks can run statements after the response has started
+            logger.warning(_budget_message(scope, stats), extra={"sql": fields})
+
+def _budget_message(scope: Scope, stats: QueryStats) -> str:
+    return f"{scope['method']} {scope['path']} ran {stats.count} queries, budget is {stats.budget}"
@@ -1,16 +1,36 @@
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from backend.app.db.instrumentation import instrument_engine
 from backend.env import DATABASE_URL
 
+# Sync engine: Alembic and the command-line scripts (every request handler uses the async engine)
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
+def _async_url(url: str) -> URL:
+    """
+    Same database, async driver: postgresql[+psycopg2] -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite.
+    """
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2"):
+        return parsed.set(drivername="postgresql+asyncpg")
+    if parsed.drivername == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite")
+    return parsed
+
+# Async engine for request handlers, so a slow query doesn't hold a threadpool slot
+async_engine = create_async_engine(_async_url(DATABASE_URL), pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Per-request query count / DB time, reported as Server-Timing headers
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
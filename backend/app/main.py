@@ -1,8 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from backend.app.api import aggregation, auth, places, travel_record, photos
+from backend.app.api import aggregation, auth, clusters, places, travel_record, photos
+from backend.app.db.instrumentation import QueryStatsMiddleware
+from backend.app.services.auth import shutdown_hash_pool
+from backend.app.services.google_maps import close_places_client, open_places_client
+from backend.app.services.photo import shutdown_derivative_pool
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_places_client()
+    yield
+    await close_places_client()
+    shutdown_hash_pool()
+    shutdown_derivative_pool()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware)
 
 # Serve Angular static files
 app.mount("/static", StaticFiles(directory="static", html=True), name="static")
@@ -11,4 +25,6 @@ app.include_router(auth.router, prefix="/api/auth")
 app.include_router(travel_record.router, prefix="/api/travel_record")
 app.include_router(aggregation.router, prefix="/api/aggregation")
 app.include_router(photos.router, prefix="/api/photos")
-app.include_router(places.router, prefix="/api/places")
\ No newline at end of file
+app.include_router(photos.usage_router, prefix="/api/photos")
+app.include_router(places.router, prefix="/api/places")
+app.include_router(clusters.router, prefix="/api/map")
\ No newline at end of file
@@ -0,0 +1,22 @@
+from datetime import date
+from sqlalchemy import Date, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from backend.app.db.base import Base
+
+# Summary tables kept in sync with travel_records in the same transaction as each write
+# (see services.aggregation.apply_record_changes), so dashboards never re-aggregate raw records.
+
+class UserCountryStats(Base):
+    __tablename__ = "user_country_stats"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    country_code: Mapped[str] = mapped_column(String(2), primary_key=True)
+    rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    record_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+class UserMonthTop(Base):
+    __tablename__ = "user_month_top"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    record_id: Mapped[int] = mapped_column(ForeignKey("travel_records.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Index, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+from backend.app.db.base import Base
+
+class PhotoBlob(Base):
+    """
+    One content-addressed file in MEDIA_ROOT, with the number of travel_records.photo_path values pointing at it.
+    """
+    __tablename__ = "photo_blobs"
+
+    path: Mapped[str] = mapped_column(String(512), primary_key=True)
+    content_type: Mapped[str | None] = mapped_column(String(64))
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # When ref_count last dropped to 0; GC only removes blobs orphaned for longer than its grace period
+    orphaned_at: Mapped[datetime | None] = mapped_column(DateTime)
+
+    __table_args__ = (
+        Index("ix_photo_blobs_orphaned_at", "orphaned_at", postgresql_where=text("ref_count = 0")),
+    )
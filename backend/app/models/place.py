@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Any
+from sqlalchemy import JSON, DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+from backend.app.db.base import Base
+
+class PlaceDetailsCache(Base):
+    """
+    Google place details by place_id (see services.places), so repeat lookups skip the network.
+    """
+    __tablename__ = "place_details_cache"
+
+    place_external_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,12 +1,25 @@
 from datetime import datetime
 from sqlalchemy import (
-    Integer, String, Float, DateTime, ForeignKey, CheckConstraint, Enum as SAEnum
+    Integer, String, Text, Float, DateTime, ForeignKey, CheckConstraint, Computed, Index, Enum as SAEnum
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from backend.app.db.base import Base
+from backend.app.db.base import Base, PostgresSQL
 from backend.app.models.user import User
 from backend.app.schemas.shared import DestinationType
 
+# Full-text document for the q filter, weighted title > city > notes
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(city, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(notes, '')), 'C')"
+)
+
+# Spherical Mercator cell at zoom 16 (same formula as services.geo.grid_xy); latitude clamped to the web-map range
+CLAMPED_LAT = "RADIANS(LEAST(GREATEST(latitude, -85.05112878), 85.05112878))"
+GRID_X_CELL = "LEAST(GREATEST(FLOOR((longitude + 180) / 360 * 65536), 0), 65535)::integer"
+GRID_Y_CELL = f"LEAST(GREATEST(FLOOR((1 - LN(TAN({CLAMPED_LAT}) + 1 / COS({CLAMPED_LAT})) / PI()) / 2 * 65536), 0), 65535)::integer"
+
 class TravelRecord(Base):
     __tablename__ = "travel_records"
 
@@ -37,12 +50,43 @@ class TravelRecord(Base):
         DateTime, onupdate=datetime.utcnow
     )
 
+    # Maintained by Postgres (left NULL elsewhere, where q falls back to LIKE); deferred so loading a record never ships it
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR().with_variant(Text, "sqlite"), Computed(PostgresSQL(SEARCH_DOCUMENT), persisted=True), deferred=True,
+    )
+    # Map grid cell for server-side clustering, maintained by Postgres (NULL elsewhere, where clustering computes the cell inline)
+    grid_x: Mapped[int | None] = mapped_column(Integer, Computed(PostgresSQL(GRID_X_CELL), persisted=True), deferred=True)
+    grid_y: Mapped[int | None] = mapped_column(Integer, Computed(PostgresSQL(GRID_Y_CELL), persisted=True), deferred=True)
+
     __table_args__ = (
         CheckConstraint("rating BETWEEN 1 AND 5", name="ck_travel_records_rating_1_5"),
+        # Keyset pagination indexes, one per sortable column (see services.travel_record.ORDERABLE)
+        Index("ix_travel_records_user_visited_at_id", "user_id", "visited_at", "id"),
+        Index("ix_travel_records_user_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_travel_records_user_rating_id", "user_id", "rating", "id"),
+        Index("ix_travel_records_user_title_id", "user_id", "title", "id"),
+        # Full-text search over search_vector
+        Index("ix_travel_records_search_vector", "search_vector", postgresql_using="gin"),
+        # Bounding-box prefilter for radius search
+        Index("ix_travel_records_user_lat_lon", "user_id", "latitude", "longitude"),
+        # Cluster queries range-scan one user's cells; rating/visited_at let the best-record pick skip the heap
+        Index(
+            "ix_travel_records_user_grid", "user_id", "grid_x", "grid_y",
+            postgresql_include=["rating", "visited_at", "latitude", "longitude"],
+        ),
+        # Joins records to photo_blobs for usage reports
+        Index("ix_travel_records_photo_path", "photo_path"),
+        # Covers every grouped-statistics dimension and metric: index-only scan of one user's entries
+        Index(
+            "ix_travel_records_user_stats", "user_id", "country_code", "visited_at",
+            postgresql_include=["rating", "city", "destination_type"],
+        ),
     )
 
     photo_path: Mapped[str | None] = mapped_column(String(512))
     photo_content_type: Mapped[str | None] = mapped_column(String(64))
     photo_size_bytes: Mapped[int | None] = mapped_column(Integer)
+    # Derivative pipeline state: pending | ready | failed
+    photo_status: Mapped[str | None] = mapped_column(String(16))
 
     user: Mapped["User"] = relationship(back_populates="records")
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Any
 from pydantic import BaseModel, Field
 from datetime import date
 
@@ -15,4 +15,12 @@ class TopDestinationPerMonth(BaseModel):
     title: str
     rating: int
     city: str | None
-    country_code: ISO2
\ No newline at end of file
+    country_code: ISO2
+
+class StatsGrouping(BaseModel):
+    group_by: list[str]
+    # Columnar: one equally long list per dimension and metric, row i across all lists is one group
+    data: dict[str, list[Any]]
+
+class StatsResponse(BaseModel):
+    groupings: list[StatsGrouping]
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+class Cluster(BaseModel):
+    count: int
+    # Centroid of the records in the cell
+    latitude: float
+    longitude: float
+    # Best-rated record in the cell; with count == 1 this is simply the record's pin
+    record_id: int
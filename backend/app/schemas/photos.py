@@ -1,7 +1,50 @@
+import os
+from typing import Literal
 from pydantic import BaseModel
 
+PhotoStatus = Literal["pending", "ready", "failed"]
+# Longest side in px of the WebP derivatives generated for every photo
+DERIVATIVE_SIZES = (1600, 640, 160)
+
 class PhotoRead(BaseModel):
     id: int
     file_path: str
     content_type: str
-    size_bytes: int
\ No newline at end of file
+    size_bytes: int
+    # Versioned by content hash, so responses for it can be cached as immutable
+    url: str
+    # Resized WebP derivatives (longest side in px -> versioned URL), present once status is "ready"
+    status: PhotoStatus | None = None
+    variants: dict[int, str] | None = None
+
+class PhotoUsage(BaseModel):
+    # Distinct original files referenced by the user's records; derivatives are not counted
+    files: int
+    bytes: int
+
+def derivative_paths(photo_path: str) -> dict[int, str]:
+    """
+    Derivatives are named after the content-addressed original, so identical uploads share them.
+    """
+    stem, _ = os.path.splitext(photo_path)
+    return {size: f"{stem}_{size}.webp" for size in DERIVATIVE_SIZES}
+
+def photo_version(photo_path: str) -> str:
+    # The content hash in the stored name; changes whenever the record's photo is replaced
+    return os.path.splitext(os.path.basename(photo_path))[0]
+
+def photo_payload(record_id: int, path: str, ctype: str | None, size: int | None, status: str | None) -> dict:
+    """
+    The PhotoRead shape of a record's flat photo_* columns.
+    """
+    url = f"/api/photos/records/{record_id}/photo"
+    version = photo_version(path)
+    return {
+        "id": record_id,
+        "file_path": path,
+        "url": f"{url}?v={version}",
+        "content_type": ctype,
+        "size_bytes": size,
+        "status": status,
+        "variants": {s: f"{url}?size={s}&v={version}" for s in DERIVATIVE_SIZES} if status == "ready" else None,
+    }
@@ -1,6 +1,8 @@
-from typing import Annotated
+from functools import lru_cache
+from typing import Annotated, Literal
 from datetime import datetime
-from pydantic import BaseModel, Field, ConfigDict, field_validator
+from pydantic import BaseModel, Field, ConfigDict, create_model, field_validator, model_validator
+from backend.app.schemas.photos import PhotoRead, photo_payload
 from backend.app.schemas.shared import DestinationType
 
 ISO2 = Annotated[str, Field(pattern=r"^[A-Z]{2}$")]
@@ -44,12 +46,6 @@ class TravelRecordUpdate(BaseModel):
     visited_at: datetime | None = None
     place_external_id: PlaceExternalId | None = None
 
-class PhotoRead(BaseModel):
-    id: int
-    file_path: str
-    content_type: str
-    size_bytes: int
-
 class TravelRecordRead(TravelRecordBase):
     id: int
     user_id: int
@@ -59,14 +55,58 @@ class TravelRecordRead(TravelRecordBase):
     photo: PhotoRead | None = None
     model_config = ConfigDict(from_attributes=True)
 
+    @model_validator(mode="before")
+    @classmethod
+    def photo_from_columns(cls, data):
+        # ORM records keep the photo as flat photo_* columns
+        if isinstance(data, dict) or not hasattr(data, "photo_path"):
+            return data
+        values = {name: getattr(data, name) for name in cls.model_fields if name != "photo" and hasattr(data, name)}
+        values["photo"] = photo_payload(
+            data.id, data.photo_path, data.photo_content_type, data.photo_size_bytes, data.photo_status,
+        ) if data.photo_path else None
+        return values
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    "id,title,rating" -> ("id", "title", "rating"); None means every field. Raises ValueError on unknown names.
+    """
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in TravelRecordRead.model_fields]
+    if unknown:
+        raise ValueError(f"unknown_fields: {', '.join(unknown)}")
+    return names or None
+
+@lru_cache(maxsize=256)
+def partial_record_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    TravelRecordRead restricted to `fields` (id is always included), built once per field set.
+    """
+    names = dict.fromkeys(("id", *fields))
+    definitions = {n: (TravelRecordRead.model_fields[n].annotation, TravelRecordRead.model_fields[n]) for n in names}
+    return create_model("PartialTravelRecordRead", __config__=ConfigDict(from_attributes=True), **definitions) # type: ignore[call-overload]
+
 class RecordsPage(BaseModel):
     items: list[TravelRecordRead]
-    total: int
+    total: int | None
     limit: int
     offset: int
+    next_cursor: str | None = None
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: int
+    # First errors only (see services.record_import.MAX_REPORTED_ERRORS)
+    errors: list[ImportRowError]
 
 class RecordFilters(BaseModel):
-    q: Annotated[str, Field(description="Search in title/notes/city/region")] | None = None
+    q: Annotated[str, Field(description="Full-text prefix search in title/notes/city")] | None = None
     country_code: ISO2 | None = None
     city: City | None = None
     dest_type: DestinationType | None = None
@@ -80,3 +120,22 @@ class RecordFilters(BaseModel):
     order_by: Annotated[str, Field(default="visited_at:desc")]
     limit: Annotated[int, Field(default=20, ge=1, le=200)]
     offset: Annotated[int, Field(default=0, ge=0)]
+    cursor: Annotated[str, Field(description="Opaque next_cursor from a previous page, replaces offset")] | None = None
+    with_total: Literal["false", "exact", "estimate"] = "exact"
+
+class BatchSelection(BaseModel):
+    # Exactly one of: explicit ids, or every record matching the filters (paging fields are ignored)
+    ids: Annotated[list[int], Field(min_length=1, max_length=10_000)] | None = None
+    filter: RecordFilters | None = None
+
+    @model_validator(mode="after")
+    def one_selector(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("give either ids or filter")
+        return self
+
+class BatchUpdate(BatchSelection):
+    patch: TravelRecordUpdate
+
+class BatchResult(BaseModel):
+    affected: int
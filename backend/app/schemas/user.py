@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 class UserCreate(BaseModel):
     name: str
@@ -15,4 +15,12 @@ class UserInfo(BaseModel):
     email: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CurrentUser(BaseModel):
+    # Immutable authenticated principal, cached across requests instead of an ORM User
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
+    id: int
+    name: str
+    email: str
@@ -1,65 +1,49 @@
-from sqlalchemy import select, func
+from datetime import date, datetime
+from typing import Iterable
+from sqlalchemy import Date, Float, Integer, cast, delete, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from backend.app.models.aggregation import UserCountryStats, UserMonthTop
 from backend.app.models.travel_record import TravelRecord
 from backend.app.schemas.aggregation import AvgRating, TopDestinationPerMonth
 
+# What the summary tables depend on for one record: (country_code, rating, visited_at)
+RecordKey = tuple[str, int, datetime]
 
-def avg_rating_by_country(db: Session, user_id: int) -> list[AvgRating]:
+# Reads are async (request path). Maintenance and rebuild take a sync Session so the same code serves
+# request handlers (via AsyncSession.run_sync) and command-line scripts.
+
+
+async def avg_rating_by_country(db: AsyncSession, user_id: int) -> list[AvgRating]:
     statement = (
-        select(
-            TravelRecord.country_code,
-            func.avg(TravelRecord.rating),
-            func.count(TravelRecord.id),
-        )
-        .where(TravelRecord.user_id == user_id)
-        .group_by(TravelRecord.country_code)
+        select(UserCountryStats.country_code, UserCountryStats.rating_sum, UserCountryStats.record_count)
+        .where(UserCountryStats.user_id == user_id, UserCountryStats.record_count > 0)
+        .order_by(UserCountryStats.country_code)
     )
-    rows = db.execute(statement).all()
-    return [AvgRating(key=c, avg_rating=float(avg), count=int(cnt)) for c, avg, cnt in rows]
+    rows = (await db.execute(statement)).all()
+    return [AvgRating(key=c, avg_rating=total / cnt, count=cnt) for c, total, cnt in rows]
 
 
-def top_destination_per_month(db: Session, user_id: int) -> list[TopDestinationPerMonth]:
-    month = func.date_trunc("month", TravelRecord.visited_at).label("month")
-    rn = func.row_number().over(
-        partition_by=month,
-        order_by=(
-            TravelRecord.rating.desc(),
-            TravelRecord.visited_at.desc(),
-            TravelRecord.id.desc(),
-        ),
-    ).label("rn")
-
-    ranked_subq = (
+async def top_destination_per_month(db: AsyncSession, user_id: int) -> list[TopDestinationPerMonth]:
+    statement = (
         select(
-            month,
-            TravelRecord.id.label("record_id"),
+            UserMonthTop.month,
+            TravelRecord.id,
             TravelRecord.title,
             TravelRecord.rating,
             TravelRecord.city,
             TravelRecord.country_code,
-            rn,
         )
-        .where(TravelRecord.user_id == user_id)
-        .subquery()
-    )
-
-    statement = (
-        select(
-            ranked_subq.c.month,
-            ranked_subq.c.record_id,
-            ranked_subq.c.title,
-            ranked_subq.c.rating,
-            ranked_subq.c.city,
-            ranked_subq.c.country_code,
-        )
-        .where(ranked_subq.c.rn == 1)
-        .order_by(ranked_subq.c.month.asc())
+        .join(TravelRecord, TravelRecord.id == UserMonthTop.record_id)
+        .where(UserMonthTop.user_id == user_id)
+        .order_by(UserMonthTop.month.asc())
     )
 
-    rows = db.execute(statement).all()
+    rows = (await db.execute(statement)).all()
     return [
         TopDestinationPerMonth(
-            month=m.date(),
+            month=m,
             record_id=rid,
             title=title,
             rating=rating,
@@ -68,3 +52,178 @@ def top_destination_per_month(db: Session, user_id: int) -> list[TopDestinationP
         )
         for (m, rid, title, rating, city, cc) in rows
     ]
+
+
+# Ad-hoc statistics: dimensions and metrics combined into GROUPING SETS, one scan for every grouping (Postgres)
+STAT_DIMENSIONS = {
+    "country_code": lambda: TravelRecord.country_code,
+    "city": lambda: TravelRecord.city,
+    "destination_type": lambda: TravelRecord.destination_type,
+    "year": lambda: cast(func.extract("year", TravelRecord.visited_at), Integer),
+    "month": lambda: cast(func.date_trunc("month", TravelRecord.visited_at), Date),
+    "week": lambda: cast(func.date_trunc("week", TravelRecord.visited_at), Date), # ISO week, starting Monday
+}
+STAT_METRICS = {
+    "count": lambda rating: func.count(),
+    "avg_rating": lambda rating: cast(func.avg(rating), Float),
+    "min_rating": lambda rating: func.min(rating),
+    "max_rating": lambda rating: func.max(rating),
+}
+
+def canonical_grouping(dimensions) -> tuple[str, ...]:
+    # In STAT_DIMENSIONS order, so (year, month) and (month, year) are one grouping set with one GROUPING() mask
+    return tuple(d for d in STAT_DIMENSIONS if d in dimensions)
+
+async def grouped_stats(db: AsyncSession, user_id: int, groupings: list[tuple[str, ...]], metrics: list[str]) -> list[dict]:
+    """
+    One GROUPING SETS query over the user's records. Returns, per grouping, its dimensions and
+    a column per dimension and metric ({"group_by": [...], "data": {name: [values...]}}); () is the grand total.
+    """
+    groupings = list(dict.fromkeys(canonical_grouping(grouping) for grouping in groupings))
+    dims = list(dict.fromkeys(d for grouping in groupings for d in grouping))
+    # Dimensions are computed once in a subquery so GROUP BY refers to plain columns, not re-bound expressions
+    base = (
+        select(TravelRecord.rating, *(STAT_DIMENSIONS[d]().label(d) for d in dims))
+        .where(TravelRecord.user_id == user_id)
+        .subquery()
+    )
+    columns = [base.c[d] for d in dims]
+    grouping_id = func.grouping(*columns).label("grouping_id") if columns else literal(0).label("grouping_id")
+    statement = (
+        select(grouping_id, *columns, *(STAT_METRICS[m](base.c.rating).label(m) for m in metrics))
+        .group_by(func.grouping_sets(*(tuple_(*(base.c[d] for d in grouping)) for grouping in groupings)))
+        .order_by(grouping_id, *columns)
+    )
+
+    # GROUPING() sets bit (n-1-i) when dimension i is not part of the row's grouping
+    by_mask = {}
+    for grouping in groupings:
+        mask = sum(1 << (len(dims) - 1 - i) for i, d in enumerate(dims) if d not in grouping)
+        by_mask[mask] = {"group_by": list(grouping), "data": {name: [] for name in (*grouping, *metrics)}}
+    for row in (await db.execute(statement)).mappings():
+        data = by_mask[row["grouping_id"]]["data"]
+        for name, values in data.items():
+            values.append(row[name])
+    return list(by_mask.values())
+
+
+def month_of(visited_at: datetime) -> date:
+    return date(visited_at.year, visited_at.month, 1)
+
+
+def _lock_month(db: Session, user_id: int, month: date) -> None:
+    """
+    Serializes refreshes of one (user, month) until commit. Without it, two concurrent writes under
+    READ COMMITTED each miss the other's uncommitted record and the last upsert can name the wrong best.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(user_id, month.year * 100 + month.month)))
+
+
+def _refresh_month(db: Session, user_id: int, month: date) -> None:
+    # Taken before the upsert, whose fresh snapshot then includes whatever the previous lock holder committed
+    _lock_month(db, user_id, month)
+    # Scans one month of the (user_id, visited_at, id) index, not the user's whole history
+    next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    best = (
+        select(literal(user_id), literal(month), TravelRecord.id)
+        .where(
+            TravelRecord.user_id == user_id,
+            TravelRecord.visited_at >= month,
+            TravelRecord.visited_at < next_month,
+        )
+        .order_by(TravelRecord.rating.desc(), TravelRecord.visited_at.desc(), TravelRecord.id.desc())
+        .limit(1)
+    )
+    # Pick and store the best record in one statement; nothing comes back only when the month is now empty
+    statement = insert(UserMonthTop).from_select(["user_id", "month", "record_id"], best)
+    stored = db.execute(statement.on_conflict_do_update(
+        index_elements=[UserMonthTop.user_id, UserMonthTop.month],
+        set_={"record_id": statement.excluded.record_id},
+    ).returning(UserMonthTop.record_id)).first()
+    if stored is None:
+        db.execute(delete(UserMonthTop).where(UserMonthTop.user_id == user_id, UserMonthTop.month == month))
+
+
+def apply_record_changes(
+    db: Session,
+    user_id: int,
+    removed: Iterable[RecordKey] = (),
+    added: Iterable[RecordKey] = (),
+) -> None:
+    """
+    Updates the summary tables for records that were removed and/or added (an update is both).
+    Must run inside the write's transaction, after the record change has been flushed.
+    """
+    deltas: dict[str, list[int]] = {}
+    months: set[date] = set()
+    for sign, keys in ((-1, removed), (1, added)):
+        for country_code, rating, visited_at in keys:
+            delta = deltas.setdefault(country_code, [0, 0])
+            delta[0] += sign * rating
+            delta[1] += sign
+            months.add(month_of(visited_at))
+
+    changed = {cc: d for cc, d in deltas.items() if d != [0, 0]}
+    if changed:
+        # Every changed country in one upsert. A country that drops to zero records keeps its row (readers
+        # skip record_count = 0) rather than costing the write a cleanup DELETE
+        statement = insert(UserCountryStats).values([
+            {"user_id": user_id, "country_code": cc, "rating_sum": rating_sum, "record_count": record_count}
+            for cc, (rating_sum, record_count) in changed.items()
+        ])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[UserCountryStats.user_id, UserCountryStats.country_code],
+            set_={
+                "rating_sum": UserCountryStats.rating_sum + statement.excluded.rating_sum,
+                "record_count": UserCountryStats.record_count + statement.excluded.record_count,
+            },
+        ))
+
+    # Sorted, so writes touching several months take their month locks in the same order
+    for month in sorted(months):
+        _refresh_month(db, user_id, month)
+
+
+def rebuild_user_aggregates(db: Session, user_id: int | None = None) -> None:
+    """
+    Recomputes the summary tables from travel_records, for one user or everyone (backfill / repair).
+    """
+    stats = delete(UserCountryStats)
+    tops = delete(UserMonthTop)
+    if user_id is not None:
+        stats = stats.where(UserCountryStats.user_id == user_id)
+        tops = tops.where(UserMonthTop.user_id == user_id)
+    db.execute(stats)
+    db.execute(tops)
+
+    by_country = select(
+        TravelRecord.user_id,
+        TravelRecord.country_code,
+        func.sum(TravelRecord.rating),
+        func.count(TravelRecord.id),
+    ).group_by(TravelRecord.user_id, TravelRecord.country_code)
+
+    month = cast(func.date_trunc("month", TravelRecord.visited_at), Date).label("month")
+    rn = func.row_number().over(
+        partition_by=(TravelRecord.user_id, month),
+        order_by=(
+            TravelRecord.rating.desc(),
+            TravelRecord.visited_at.desc(),
+            TravelRecord.id.desc(),
+        ),
+    ).label("rn")
+    ranked_subq = select(TravelRecord.user_id, month, TravelRecord.id.label("record_id"), rn)
+
+    if user_id is not None:
+        by_country = by_country.where(TravelRecord.user_id == user_id)
+        ranked_subq = ranked_subq.where(TravelRecord.user_id == user_id)
+    ranked = ranked_subq.subquery()
+
+    db.execute(insert(UserCountryStats).from_select(
+        ["user_id", "country_code", "rating_sum", "record_count"], by_country,
+    ))
+    db.execute(insert(UserMonthTop).from_select(
+        ["user_id", "month", "record_id"],
+        select(ranked.c.user_id, ranked.c.month, ranked.c.record_id).where(ranked.c.rn == 1),
+    ))
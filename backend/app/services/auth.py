@@ -1,16 +1,25 @@
+import asyncio, os
+from concurrent.futures import ProcessPoolExecutor
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from backend.env import JWT_SECRET
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select
+from backend.env import JWT_SECRET, get_env
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from backend.app.db.session import get_db
-from backend.app.models.user import User  
+from backend.app.db.session import get_async_db
+from backend.app.models.user import User
+from backend.app.schemas.user import CurrentUser
+from backend.app.services.cache import TTLCache
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Raising BCRYPT_ROUNDS makes older hashes "need update", they are rehashed on the next successful login
+BCRYPT_ROUNDS = int(get_env("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -18,6 +27,56 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# bcrypt runs in a dedicated process pool so a login spike can't starve the event loop or the request threadpool.
+# Past HASH_MAX_PENDING queued jobs we answer 503 right away instead of queueing unbounded work.
+HASH_WORKERS = int(get_env("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(get_env("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pending = 0
+
+async def _run_hashing(fn, *args):
+    global _hash_pool, _hash_pending
+    if _hash_pending >= HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+async def authenticate(db: AsyncSession, email: str, password: str) -> User | None:
+    """
+    Returns the user when the password matches, transparently rehashing it if the bcrypt cost changed.
+    """
+    user = (await db.scalars(select(User).where(User.email == email).limit(1))).first()
+    if user is None:
+        return None
+    ok, new_hash = await _run_hashing(verify_and_update_password, password, user.hashed_password)
+    if not ok:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
+
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
@@ -30,7 +89,20 @@ def create_access_token(data: dict):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+# Authenticated principals by user id. The JWT is still verified on every request,
+# only the users lookup is skipped while the entry is fresh.
+PRINCIPAL_TTL_SECONDS = 300
+_principals = TTLCache(maxsize=10_000, ttl=PRINCIPAL_TTL_SECONDS)
+
+def invalidate_principal(user_id: int) -> None:
+    _principals.pop(user_id)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User) -> None:
+    invalidate_principal(target.id)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -44,9 +116,15 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
+    principal = _principals.get(user_id)
+    if principal is not None:
+        return principal
+
     statement = select(User).where(User.id == user_id).limit(1)
-    user = db.execute(statement).scalars().first()
+    user = (await db.scalars(statement)).first()
     if user is None:
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    principal = CurrentUser.model_validate(user)
+    _principals.set(user_id, principal)
+    return principal
\ No newline at end of file
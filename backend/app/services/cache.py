@@ -0,0 +1,99 @@
+import hashlib, secrets, threading, time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+from fastapi import Request, Response
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Per-user data version, bumped on every write to a user's travel records.
+# Caches key their entries on it so a write invalidates everything derived from the old data.
+# Lives in-process: the epoch changes on restart so versions never repeat across processes.
+_EPOCH = secrets.token_hex(4)
+_versions: dict[int, int] = {}
+_versions_lock = threading.Lock()
+
+def data_version(user_id: int) -> str:
+    return f"{_EPOCH}.{_versions.get(user_id, 0)}"
+
+def bump_data_version(user_id: int) -> None:
+    with _versions_lock:
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+
+
+# Conditional GET: weak ETags derived from the user's data version, so a revalidation
+# costs no database work, plus a server-side response cache keyed on the same tag.
+CACHE_CONTROL = "private, no-cache"
+_responses = TTLCache(maxsize=2048, ttl=600)
+
+def weak_etag(user_id: int, *parts: object) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+    return f'W/"{data_version(user_id)}-{digest}"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 8.8.3.2): ignore the W/ prefix on both sides
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+async def conditional_get(request: Request, response: Response, user_id: int, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Returns 304 when If-None-Match still matches, otherwise the cached or freshly computed body.
+    `compute` should return something safe to share between requests (e.g. pydantic models, not ORM objects),
+    or already-encoded JSON bytes, which are sent as they are without response_model validation.
+    """
+    etag = weak_etag(user_id, request.url.path, request.url.query)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    key = (user_id, etag)
+    body = _responses.get(key)
+    if body is None:
+        body = await compute()
+        _responses.set(key, body)
+    if isinstance(body, bytes):
+        return Response(content=body, media_type="application/json", headers=headers)
+    return body
@@ -0,0 +1,98 @@
+from collections import defaultdict
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.models.travel_record import TravelRecord
+from backend.app.services.cache import TTLCache, data_version
+from backend.app.services.geo import GRID_LEVEL, grid_expressions, grid_xy
+
+# Each map tile is split into 8x8 cluster cells (~32px on a 256px tile)
+CELL_BITS = 3
+MAX_ZOOM = GRID_LEVEL - CELL_BITS # beyond this the grid has no finer cells, deeper zooms reuse it
+MAX_TILES = 256 # a 4K viewport at 256px tiles is ~150
+
+# Clusters per (user, data version, zoom, tile x, tile y); a write bumps the version
+_tiles = TTLCache(maxsize=16384, ttl=600)
+
+def tile_ranges(min_lat: float, max_lat: float, min_lon: float, max_lon: float, zoom: int) -> tuple[list[range], range]:
+    """
+    Tiles covering the box as (x ranges, y range); two x ranges when it wraps the antimeridian (min_lon > max_lon).
+    """
+    shift = GRID_LEVEL - zoom
+    x0, y0 = (v >> shift for v in grid_xy(max_lat, min_lon))
+    x1, y1 = (v >> shift for v in grid_xy(min_lat, max_lon))
+    xs = [range(x0, x1 + 1)] if x0 <= x1 else [range(x0, 1 << zoom), range(0, x1 + 1)]
+    return xs, range(y0, y1 + 1)
+
+async def _load_tiles(db: AsyncSession, user_id: int, zoom: int, xs: range, ys: range) -> dict[tuple[int, int], list[dict]]:
+    """
+    One indexed range scan over the user's grid cells for a block of tiles, grouped into cluster cells.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Generated columns covered by the (user_id, grid_x, grid_y) index
+        gx, gy = TravelRecord.grid_x, TravelRecord.grid_y
+    else:
+        gx, gy = grid_expressions(TravelRecord.latitude, TravelRecord.longitude)
+    tile_shift = GRID_LEVEL - zoom
+    cell_shift = tile_shift - CELL_BITS
+    cx, cy = gx.op(">>")(cell_shift), gy.op(">>")(cell_shift)
+
+    cell = (cx, cy)
+    ranked = (
+        select(
+            cx.label("cx"), cy.label("cy"), TravelRecord.id,
+            func.count().over(partition_by=cell).label("count"),
+            func.avg(TravelRecord.latitude).over(partition_by=cell).label("latitude"),
+            func.avg(TravelRecord.longitude).over(partition_by=cell).label("longitude"),
+            # Best-rated (then most recent) record per cell, shown as the cluster's representative
+            func.row_number().over(
+                partition_by=cell,
+                order_by=(TravelRecord.rating.desc(), TravelRecord.visited_at.desc(), TravelRecord.id.desc()),
+            ).label("rn"),
+        )
+        .where(
+            TravelRecord.user_id == user_id,
+            gx.between(xs.start << tile_shift, (xs.stop << tile_shift) - 1),
+            gy.between(ys.start << tile_shift, (ys.stop << tile_shift) - 1),
+        )
+        .subquery()
+    )
+    statement = select(ranked.c.cx, ranked.c.cy, ranked.c.id, ranked.c["count"], ranked.c.latitude, ranked.c.longitude).where(ranked.c.rn == 1)
+
+    tiles: dict[tuple[int, int], list[dict]] = defaultdict(list)
+    for row in (await db.execute(statement)).all():
+        tiles[(row.cx >> CELL_BITS, row.cy >> CELL_BITS)].append({
+            "count": row.count,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "record_id": row.id,
+        })
+    return tiles
+
+async def clusters_in_box(db: AsyncSession, user_id: int, min_lat: float, max_lat: float, min_lon: float, max_lon: float, zoom: int) -> list[dict]:
+    """
+    Clusters (count, centroid, best record) for every tile of the box at `zoom`. Tiles are cached per data version,
+    so panning only queries the tiles that came into view.
+    """
+    if min_lat > max_lat:
+        raise ValueError("min_lat must not exceed max_lat")
+    zoom = min(zoom, MAX_ZOOM)
+    x_ranges, ys = tile_ranges(min_lat, max_lat, min_lon, max_lon, zoom)
+    if sum(len(xs) for xs in x_ranges) * len(ys) > MAX_TILES:
+        raise ValueError("box_too_large_for_zoom")
+
+    version = data_version(user_id)
+    result: list[dict] = []
+    for xs in x_ranges:
+        cached = {(x, y): _tiles.get((user_id, version, zoom, x, y)) for x in xs for y in ys}
+        missing = [tile for tile, clusters in cached.items() if clusters is None]
+        if missing:
+            # Narrowest block of tiles holding every miss, loaded in one statement
+            mx = range(min(x for x, _ in missing), max(x for x, _ in missing) + 1)
+            my = range(min(y for _, y in missing), max(y for _, y in missing) + 1)
+            loaded = await _load_tiles(db, user_id, zoom, mx, my)
+            for tile in missing:
+                cached[tile] = loaded.get(tile, [])
+                _tiles.set((user_id, version, zoom, *tile), cached[tile])
+        for clusters in cached.values():
+            result.extend(clusters)
+    return result
@@ -0,0 +1,69 @@
+import math
+from sqlalchemy import Integer, and_, case, cast, func, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+EARTH_RADIUS_KM = 6371.0088
+
+def bounding_box(lat: float, lon: float, km: float) -> tuple[float, float, float, float]:
+    """
+    Smallest lat/lon box containing the circle of radius `km` around (lat, lon).
+    Returns (min_lat, max_lat, min_lon, max_lon); min_lon > max_lon means the box wraps the antimeridian.
+    """
+    angular = km / EARTH_RADIUS_KM
+    min_lat = lat - math.degrees(angular)
+    max_lat = lat + math.degrees(angular)
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        # Circle covers a pole, every longitude qualifies
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    dlon = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(lat)))))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, max_lat, min_lon, max_lon
+
+def bbox_condition(lat_col, lon_col, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> ColumnElement[bool]:
+    lon_cond = lon_col.between(min_lon, max_lon) if min_lon <= max_lon else or_(lon_col >= min_lon, lon_col <= max_lon)
+    return and_(lat_col.between(min_lat, max_lat), lon_cond)
+
+def haversine_km(lat_col, lon_col, lat: float, lon: float) -> ColumnElement[float]:
+    """
+    Great-circle distance in km between a row's coordinates and (lat, lon), as a SQL expression.
+    """
+    dlat = func.radians(lat_col - lat)
+    dlon = func.radians(lon_col - lon)
+    a = (
+        func.power(func.sin(dlat / 2), 2)
+        + math.cos(math.radians(lat)) * func.cos(func.radians(lat_col)) * func.power(func.sin(dlon / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(1.0, a)))
+
+# Web-map (spherical Mercator) grid at zoom GRID_LEVEL: 2**16 cells per axis, ~600 m at the equator.
+# The cell at a coarser zoom z is (grid >> (GRID_LEVEL - z)), so one precomputed pair serves every zoom.
+GRID_LEVEL = 16
+GRID_SIZE = 1 << GRID_LEVEL
+MAX_MERCATOR_LAT = 85.05112878
+
+def grid_xy(lat: float, lon: float) -> tuple[int, int]:
+    """
+    Grid cell of a point; same formula as the travel_records.grid_x/grid_y generated columns.
+    """
+    lat = min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    x = math.floor((lon + 180) / 360 * GRID_SIZE)
+    rad = math.radians(lat)
+    y = math.floor((1 - math.log(math.tan(rad) + 1 / math.cos(rad)) / math.pi) / 2 * GRID_SIZE)
+    return min(max(x, 0), GRID_SIZE - 1), min(max(y, 0), GRID_SIZE - 1)
+
+def _clamp(expr, low, high):
+    return case((expr < low, low), (expr > high, high), else_=expr)
+
+def grid_expressions(lat_col, lon_col) -> tuple[ColumnElement[int], ColumnElement[int]]:
+    """
+    grid_xy() as SQL, for databases without the generated columns (see TravelRecord.grid_x/grid_y).
+    """
+    x = func.floor((lon_col + 180) / 360 * GRID_SIZE)
+    rad = func.radians(_clamp(lat_col, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    y = func.floor((1 - func.ln(func.tan(rad) + 1 / func.cos(rad)) / func.pi()) / 2 * GRID_SIZE)
+    return cast(_clamp(x, 0, GRID_SIZE - 1), Integer), cast(_clamp(y, 0, GRID_SIZE - 1), Integer)
@@ -1,23 +1,92 @@
 from __future__ import annotations
+import asyncio, importlib.util, logging, random, re
+from collections import Counter
 from typing import Any, Dict, List, Optional
 import httpx
-from backend.env import GOOGLE_MAPS_API_KEY
+from backend.app.services.cache import TTLCache
+from backend.env import GOOGLE_MAPS_API_KEY, GOOGLE_PLACES_BASE_URL, GOOGLE_PLACES_HTTP2
 
-PLACES_AUTOCOMPLETE = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-PLACES_DETAILS      = "https://maps.googleapis.com/maps/api/place/details/json"
+logger = logging.getLogger("backend.places")
+
+PLACES_AUTOCOMPLETE = "/autocomplete/json"
+PLACES_DETAILS      = "/details/json"
+
+# Autocomplete fires per keystroke, so it gives up much sooner than details
+AUTOCOMPLETE_TIMEOUT = httpx.Timeout(3.0, connect=2.0)
+DETAILS_TIMEOUT      = httpx.Timeout(6.0, connect=2.0)
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.1 # seconds, doubled per attempt with full jitter
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Google reports throttling and its own hiccups in the body of a 200
+UNAVAILABLE_API_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
 
 class PlacesError(RuntimeError): ...
 
+class PlacesUnavailable(PlacesError):
+    """
+    Upstream could not be reached or kept failing after retries (as opposed to rejecting the request).
+    """
+
+# Normalized query -> predictions. Session tokens only group calls for billing and don't change
+# results, so they're not part of the key; a miss forwards the caller's token upstream.
+_autocomplete_cache = TTLCache(maxsize=10_000, ttl=600)
+# In-flight upstream calls per normalized query (single-flight)
+_inflight: dict[str, asyncio.Task] = {}
+autocomplete_stats: Counter[str] = Counter(hits=0, prefix_hits=0, coalesced=0, misses=0)
+# Process-wide numbers, so they go to the log (every N upstream calls and at shutdown) rather than to any user
+AUTOCOMPLETE_STATS_LOG_EVERY = 1000
+AUTOCOMPLETE_MAX_PREDICTIONS = 5 # Google's cap; a shorter list is everything that matched
+
+# One pooled client for the app's lifetime so keystrokes reuse warm TCP/TLS connections,
+# opened/closed by the FastAPI lifespan (and lazily for scripts that never run it)
+_client: httpx.AsyncClient | None = None
+
+def open_places_client(base_url: str = GOOGLE_PLACES_BASE_URL, **kwargs) -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=GOOGLE_PLACES_HTTP2 and importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+            timeout=DETAILS_TIMEOUT,
+            **kwargs,
+        )
+    return _client
+
+async def close_places_client() -> None:
+    global _client
+    log_autocomplete_cache_stats()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def _get_json(path: str, params: dict, timeout: httpx.Timeout) -> dict:
+    """
+    GET with retries on connection errors, timeouts, 429 and 5xx (all of these calls are idempotent).
+    """
+    client = open_places_client()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            r = await client.get(path, params=params, timeout=timeout)
+            if r.status_code not in RETRY_STATUSES:
+                r.raise_for_status()
+                return r.json()
+            failure = f"HTTP {r.status_code}"
+        except httpx.TransportError as e:
+            failure = type(e).__name__
+        except (httpx.HTTPStatusError, ValueError) as e:
+            raise PlacesError(f"Places request failed: {e}")
+        if attempt < MAX_RETRIES:
+            await asyncio.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+    raise PlacesUnavailable(f"Places upstream unavailable: {failure}")
+
 def _require_api_key() -> str:
     key = GOOGLE_MAPS_API_KEY
     if not key:
         raise PlacesError("Google Maps API key missing (set GOOGLE_MAPS_API_KEY)")
     return key
 
-async def autocomplete(query: str, session_token: Optional[str] = None) -> List[Dict[str, Any]]:
-    """
-    Returns minimal predictions for UI: [{place_id, description}]
-    """
+async def _fetch_autocomplete(query: str, session_token: Optional[str]) -> List[Dict[str, Any]]:
     key = _require_api_key()
     params = {
         "input": query,
@@ -27,15 +96,78 @@ async def autocomplete(query: str, session_token: Optional[str] = None) -> List[
     if session_token:
         params["sessiontoken"] = session_token
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        r = await client.get(PLACES_AUTOCOMPLETE, params=params)
-        data = r.json()
+    data = await _get_json(PLACES_AUTOCOMPLETE, params, AUTOCOMPLETE_TIMEOUT)
 
+    if data.get("status") in UNAVAILABLE_API_STATUSES:
+        raise PlacesUnavailable(f"Autocomplete failed: {data.get('status')}")
     if data.get("status") not in {"OK", "ZERO_RESULTS"}:
         raise PlacesError(f"Autocomplete failed: {data.get('status')} - {data.get('error_message')}")
 
     preds = data.get("predictions", [])
-    return [{"place_id": p["place_id"], "description": p.get("description", "")} for p in preds]
+    result = [{"place_id": p["place_id"], "description": p.get("description", "")} for p in preds]
+    _autocomplete_cache.set(query, result)
+    return result
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def _matches(description: str, terms: list[str]) -> bool:
+    words = re.findall(r"\w+", description.lower())
+    return all(any(w.startswith(t) for w in words) for t in terms)
+
+def _refine_from_prefix(query: str) -> List[Dict[str, Any]] | None:
+    """
+    Answers "paris" from a cached "par" when that list was complete (under the prediction cap):
+    anything matching the longer query was then already in it, so filtering is enough.
+    """
+    terms = re.findall(r"\w+", query)
+    for end in range(len(query) - 1, 0, -1):
+        cached = _autocomplete_cache.get(query[:end])
+        if cached is not None and len(cached) < AUTOCOMPLETE_MAX_PREDICTIONS:
+            return [p for p in cached if _matches(p["description"], terms)]
+    return None
+
+async def autocomplete(query: str, session_token: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Returns minimal predictions for UI: [{place_id, description}]
+    Served from cache, a complete cached prefix, or a single upstream call shared by identical concurrent queries.
+    """
+    query = normalize_query(query)
+    cached = _autocomplete_cache.get(query)
+    if cached is not None:
+        autocomplete_stats["hits"] += 1
+        return cached
+    refined = _refine_from_prefix(query)
+    if refined is not None:
+        autocomplete_stats["prefix_hits"] += 1
+        _autocomplete_cache.set(query, refined)
+        return refined
+
+    task = _inflight.get(query)
+    if task is None:
+        autocomplete_stats["misses"] += 1
+        if autocomplete_stats["misses"] % AUTOCOMPLETE_STATS_LOG_EVERY == 0:
+            log_autocomplete_cache_stats()
+        # A task rather than the caller's coroutine, so one client disconnecting doesn't cancel the call for everyone
+        task = asyncio.create_task(_fetch_autocomplete(query, session_token))
+        _inflight[query] = task
+        task.add_done_callback(lambda t: _autocomplete_done(query, t))
+    else:
+        autocomplete_stats["coalesced"] += 1
+    return await asyncio.shield(task)
+
+def _autocomplete_done(query: str, task: asyncio.Task) -> None:
+    _inflight.pop(query, None)
+    if not task.cancelled():
+        task.exception() # mark retrieved even if every waiter went away
+
+def log_autocomplete_cache_stats() -> None:
+    stats = {"size": len(_autocomplete_cache), **autocomplete_stats}
+    logger.info(
+        "autocomplete cache size=%d hits=%d prefix_hits=%d coalesced=%d misses=%d",
+        stats["size"], stats["hits"], stats["prefix_hits"], stats["coalesced"], stats["misses"],
+        extra={"autocomplete_cache": stats},
+    )
 
 def _addr_get(components: list[dict], typ: str, *, short: bool = False) -> Optional[str]:
     for c in components:
@@ -58,10 +190,10 @@ async def place_details(place_id: str) -> Dict[str, Any]:
         "key": key,
         "fields": "address_component,geometry,name,place_id",
     }
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        r = await client.get(PLACES_DETAILS, params=params)
-        data = r.json()
+    data = await _get_json(PLACES_DETAILS, params, DETAILS_TIMEOUT)
 
+    if data.get("status") in UNAVAILABLE_API_STATUSES:
+        raise PlacesUnavailable(f"Details failed: {data.get('status')}")
     if data.get("status") != "OK":
         raise PlacesError(f"Details failed: {data.get('status')} - {data.get('error_message')}")
 
@@ -1,25 +1,252 @@
-import os, pathlib, hashlib
-from fastapi import UploadFile
+import asyncio, os, pathlib, hashlib, re, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.responses import FileResponse, Response, StreamingResponse
 import aiofiles
+import aiofiles.os
+from backend.app.schemas.photos import DERIVATIVE_SIZES, derivative_paths
+from backend.env import get_env
 
 MEDIA_ROOT = "media"
 ALLOWED = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp"}
 MAX_MB = 10
+CHUNK_SIZE = 64 * 1024
+# Originals are stored as <first 20 hex chars of their sha256><extension>
+HASH_CHARS = 20
+ORIGINAL_NAME = re.compile(rf"[0-9a-f]{{{HASH_CHARS}}}({'|'.join(re.escape(ext) for ext in ALLOWED.values())})")
+DERIVATIVE_WORKERS = int(get_env("DERIVATIVE_WORKERS", str(min(2, os.cpu_count() or 1))))
 
-async def save_upload(file: UploadFile) -> tuple[str, str, int]:
-    raw = await file.read()
-    size = len(raw)
-    ctype = file.content_type or ""
-    if ctype not in ALLOWED:
-        raise ValueError("unsupported_mime")
-    if size > MAX_MB * 1024 * 1024:
-        raise ValueError("file_too_large")
+# Bytes needed to recognise every allowed type (WebP: "RIFF" + size + "WEBP")
+SNIFF_BYTES = 12
 
+def sniff_content_type(head: bytes) -> str | None:
+    """
+    Detects an allowed image type from its magic bytes, the client's Content-Type is not trusted.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+# Largest request body accepted for an upload: the file limit plus room for the multipart framing
+MAX_REQUEST_BYTES = MAX_MB * 1024 * 1024 + CHUNK_SIZE
+
+async def multipart_file_chunks(body: AsyncIterator[bytes], content_type: str, field: str = "file") -> AsyncIterator[bytes]:
+    """
+    Yields the bytes of the `field` part of a multipart/form-data body as they arrive, so the caller can
+    reject the upload mid-stream instead of after Starlette has spooled the whole request.
+    """
+    mime, params = parse_options_header(content_type)
+    if mime != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("expected_multipart")
+
+    pending: list[bytes] = []
+    header_field = header_value = b""
+    in_field = found = done = False
+
+    def on_part_begin():
+        nonlocal header_field, header_value
+        header_field = header_value = b""
+
+    def on_header_field(data: bytes, start: int, end: int):
+        nonlocal header_field
+        header_field += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        nonlocal header_value
+        header_value += data[start:end]
+
+    def on_header_end():
+        nonlocal header_field, header_value, in_field, found
+        if header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(header_value)
+            if options.get(b"name") == field.encode() and not found:
+                in_field = found = True
+        header_field = header_value = b""
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if in_field:
+            pending.append(data[start:end])
+
+    def on_part_end():
+        nonlocal in_field, done
+        if in_field:
+            in_field, done = False, True
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field, "on_header_value": on_header_value,
+        "on_header_end": on_header_end, "on_part_data": on_part_data, "on_part_end": on_part_end,
+    })
+    async for chunk in body:
+        parser.write(chunk)
+        for piece in pending:
+            yield piece
+        pending.clear()
+        if done:
+            return # the rest of the body is never read
+    if not done:
+        raise ValueError("missing_file")
+
+async def save_upload(chunks: AsyncIterator[bytes]) -> tuple[str, str, int, str]:
+    """
+    Streams the upload to a temp file in MEDIA_ROOT while hashing it, rejecting it as soon as the
+    magic bytes or the size are wrong, then links it under its content-addressed name.
+    Returns (path, content type, size, spare): the temp file is kept as a spare copy until the blob's
+    reference is committed, see settle_upload().
+    """
     pathlib.Path(MEDIA_ROOT).mkdir(parents=True, exist_ok=True)
-    name = hashlib.sha256(raw).hexdigest()[:20] + ALLOWED[ctype]
-    path = os.path.join(MEDIA_ROOT, name)
+    fd, tmp_path = tempfile.mkstemp(dir=MEDIA_ROOT, prefix=".upload-")
+    os.close(fd)
+
+    digest = hashlib.sha256()
+    size = 0
+    ctype = None
+    head = b"" # held back until there are enough bytes to sniff
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > MAX_MB * 1024 * 1024:
+                    raise ValueError("file_too_large")
+                if ctype is None:
+                    head += chunk
+                    if len(head) < SNIFF_BYTES:
+                        continue
+                    ctype = sniff_content_type(head)
+                    if ctype is None:
+                        raise ValueError("unsupported_mime")
+                    chunk, head = head, b""
+                digest.update(chunk)
+                await out.write(chunk)
+            if ctype is None:
+                # short (or empty) upload
+                ctype = sniff_content_type(head)
+                if ctype is None:
+                    raise ValueError("unsupported_mime")
+                digest.update(head)
+                await out.write(head)
+
+        name = digest.hexdigest()[:HASH_CHARS] + ALLOWED[ctype]
+        path = os.path.join(MEDIA_ROOT, name)
+        try:
+            await aiofiles.os.link(tmp_path, path)
+        except FileExistsError:
+            pass # same content already stored, keep the existing blob
+    except BaseException:
+        if await aiofiles.os.path.exists(tmp_path):
+            await aiofiles.os.remove(tmp_path)
+        raise
+
+    return path, ctype, size, tmp_path
+
+async def settle_upload(path: str, spare: str) -> bool:
+    """
+    Runs once the upload's reference is committed (or abandoned). The garbage collector may have removed
+    a stored file with the same content between save_upload() and the commit; the spare copy then
+    takes its place. Returns True when the file had to be restored (its derivatives are gone too).
+    """
+    if await aiofiles.os.path.exists(path):
+        await aiofiles.os.remove(spare)
+        return False
+    await aiofiles.os.replace(spare, path)
+    return True
+
+
+
+def has_derivatives(photo_path: str) -> bool:
+    return all(os.path.exists(p) for p in derivative_paths(photo_path).values())
+
+def make_derivatives(photo_path: str) -> None:
+    """
+    Runs in the derivative process pool: decodes the original once and downscales it step by step
+    (largest size first), writing each WebP atomically.
+    """
+    from PIL import Image, ImageOps
+
+    targets = derivative_paths(photo_path)
+    with Image.open(photo_path) as original:
+        original.draft("RGB", (max(DERIVATIVE_SIZES), max(DERIVATIVE_SIZES))) # JPEG: decode at reduced scale
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+        for size in DERIVATIVE_SIZES:
+            path = targets[size]
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if os.path.exists(path):
+                continue
+            tmp_path = path + ".tmp"
+            img.save(tmp_path, "WEBP", quality=80, method=4)
+            os.replace(tmp_path, path)
+
+_derivative_pool: ProcessPoolExecutor | None = None
+
+async def generate_derivatives(photo_path: str) -> bool:
+    global _derivative_pool
+    if _derivative_pool is None:
+        _derivative_pool = ProcessPoolExecutor(max_workers=DERIVATIVE_WORKERS)
+    try:
+        await asyncio.get_running_loop().run_in_executor(_derivative_pool, make_derivatives, photo_path)
+    except Exception:
+        return False
+    return True
+
+def shutdown_derivative_pool() -> None:
+    global _derivative_pool
+    if _derivative_pool is not None:
+        _derivative_pool.shutdown(cancel_futures=True)
+        _derivative_pool = None
+
+
+def parse_range(header: str | None, file_size: int) -> tuple[int, int] | None:
+    """
+    Parses a single "bytes=start-end" range into inclusive offsets. None means serve the whole file
+    (no header, or a multi-range request we don't support); ValueError means unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_s, _, end_s = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else file_size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(file_size - int(end_s), 0), file_size - 1
+    except ValueError:
+        return None
+    end = min(end, file_size - 1)
+    if start > end or start >= file_size:
+        raise ValueError("range_not_satisfiable")
+    return start, end
+
+async def _read_range(path: str, start: int, end: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
 
-    async with aiofiles.open(path, "wb") as f:
-        await f.write(raw)
+def file_response(path: str, media_type: str, range_header: str | None, headers: dict[str, str]) -> Response:
+    """
+    Serves a stored file, honouring a single byte Range (206 / 416). Raises FileNotFoundError if it's gone.
+    """
+    file_size = os.stat(path).st_size
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    try:
+        byte_range = parse_range(range_header, file_size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{file_size}"})
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
 
-    return path, ctype, size
+    start, end = byte_range
+    headers.update({"Content-Range": f"bytes {start}-{end}/{file_size}", "Content-Length": str(end - start + 1)})
+    return StreamingResponse(_read_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
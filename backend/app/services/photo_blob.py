@@ -0,0 +1,131 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from backend.app.models.photo_blob import PhotoBlob
+from backend.app.models.travel_record import TravelRecord
+from backend.app.schemas.photos import derivative_paths
+from backend.app.services.photo import MEDIA_ROOT, ORIGINAL_NAME
+
+# Like the aggregation tables, refcounts are maintained with a sync Session inside the write's
+# transaction (AsyncSession.run_sync from request handlers), and the GC command uses them directly.
+
+def add_ref(db: Session, path: str, content_type: str | None, size_bytes: int) -> None:
+    statement = insert(PhotoBlob).values(
+        path=path, content_type=content_type, size_bytes=size_bytes, ref_count=1, created_at=datetime.utcnow(),
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[PhotoBlob.path],
+        set_={"ref_count": PhotoBlob.ref_count + 1, "orphaned_at": None},
+    ))
+
+def release_refs(db: Session, paths: Iterable[str | None]) -> None:
+    """
+    Drops one reference per occurrence of each path; blobs reaching zero are stamped for GC.
+    """
+    by_count: dict[int, list[str]] = {}
+    for path, n in Counter(p for p in paths if p).items():
+        by_count.setdefault(n, []).append(path)
+    now = datetime.utcnow()
+    for n, group in by_count.items():
+        db.execute(
+            update(PhotoBlob)
+            .where(PhotoBlob.path.in_(group))
+            .values(
+                ref_count=case((PhotoBlob.ref_count - n <= 0, 0), else_=PhotoBlob.ref_count - n),
+                orphaned_at=case((PhotoBlob.ref_count - n <= 0, now), else_=None),
+            )
+        )
+
+def replace_ref(db: Session, old_path: str | None, new_path: str, content_type: str | None, size_bytes: int) -> None:
+    if old_path == new_path:
+        return
+    add_ref(db, new_path, content_type, size_bytes)
+    release_refs(db, [old_path])
+
+def _unlink(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def collect_garbage(db: Session, grace: timedelta, batch_size: int = 500) -> tuple[int, int]:
+    """
+    Deletes blobs unreferenced for longer than `grace`, `batch_size` rows per transaction.
+    Files are removed while their rows are locked and the rows deleted in the same transaction: an upload
+    of the same content blocks in add_ref() until the commit, re-creates the row, and then finds the file
+    gone and restores it from its own copy (photo.settle_upload). An upload whose reference commits first
+    takes the row out of the ref_count = 0 set before it is locked.
+    Returns (files removed, bytes freed).
+    """
+    files = freed = 0
+    cutoff = datetime.utcnow() - grace
+    while True:
+        rows = db.execute(
+            select(PhotoBlob.path, PhotoBlob.size_bytes)
+            .where(PhotoBlob.ref_count == 0, PhotoBlob.orphaned_at < cutoff)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not rows:
+            db.commit()
+            return files, freed
+        for path, size_bytes in rows:
+            _unlink(path)
+            for derivative in derivative_paths(path).values():
+                _unlink(derivative)
+            files += 1
+            freed += size_bytes
+        db.execute(delete(PhotoBlob).where(PhotoBlob.path.in_([path for path, _ in rows])))
+        db.commit()
+
+def register_orphan(db: Session, path: str, content_type: str | None, size_bytes: int) -> int:
+    """
+    Tracks a stored file nothing references yet (ref_count 0, orphaned now) so the GC collects it after
+    its grace period; a no-op when the blob is already registered. Returns the number of rows inserted.
+    """
+    statement = insert(PhotoBlob).values(
+        path=path, content_type=content_type, size_bytes=size_bytes, ref_count=0,
+        created_at=datetime.utcnow(), orphaned_at=datetime.utcnow(),
+    ).on_conflict_do_nothing(index_elements=[PhotoBlob.path])
+    return db.execute(statement).rowcount
+
+def adopt_unreferenced_files(db: Session) -> int:
+    """
+    One-off backfill: registers originals in MEDIA_ROOT that have no photo_blobs row (uploads from before
+    refcounting, or files left by a crash) as orphans so the GC can collect them.
+    """
+    adopted = 0
+    with os.scandir(MEDIA_ROOT) as entries:
+        files = {entry.name: entry for entry in entries if entry.is_file()}
+    # Only content-addressed originals; derivatives (<hash>_<size>.webp) go with their original
+    originals = [name for name in files if ORIGINAL_NAME.fullmatch(name)]
+    derivatives = {os.path.basename(d) for name in originals for d in derivative_paths(name).values()}
+    for name in originals:
+        if name in derivatives:
+            continue
+        adopted += register_orphan(db, os.path.join(MEDIA_ROOT, name), None, files[name].stat().st_size)
+    db.commit()
+    return adopted
+
+def usage_statement(user_id: int | None = None):
+    """
+    Files and bytes of original photos per user (a blob shared by two of the user's records counts once).
+    """
+    refs = select(TravelRecord.user_id, TravelRecord.photo_path).where(TravelRecord.photo_path.is_not(None)).distinct()
+    if user_id is not None:
+        refs = refs.where(TravelRecord.user_id == user_id)
+    refs = refs.subquery()
+    return (
+        select(
+            refs.c.user_id,
+            func.count(PhotoBlob.path).label("files"),
+            func.coalesce(func.sum(PhotoBlob.size_bytes), 0).label("bytes"),
+        )
+        .join(PhotoBlob, PhotoBlob.path == refs.c.photo_path)
+        .group_by(refs.c.user_id)
+        .order_by(refs.c.user_id)
+    )
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.models.place import PlaceDetailsCache
+from backend.app.models.travel_record import TravelRecord
+from backend.app.services.google_maps import PlacesError, place_details
+
+# Details of a place rarely change; past this age an entry is refetched, but still served if the refetch fails
+PLACE_DETAILS_MAX_AGE = timedelta(days=30)
+
+async def _store(db: AsyncSession, place_id: str, payload: dict[str, Any]) -> None:
+    statement = insert(PlaceDetailsCache).values(place_external_id=place_id, payload=payload, fetched_at=datetime.utcnow())
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[PlaceDetailsCache.place_external_id],
+        set_={"payload": statement.excluded.payload, "fetched_at": statement.excluded.fetched_at},
+    ))
+
+async def cached_place_details(db: AsyncSession, place_id: str) -> dict[str, Any]:
+    row = await db.get(PlaceDetailsCache, place_id)
+    if row and row.fetched_at > datetime.utcnow() - PLACE_DETAILS_MAX_AGE:
+        return row.payload
+    try:
+        payload = await place_details(place_id)
+    except PlacesError:
+        if row:
+            return row.payload # stale beats nothing, whatever the upstream failure (outage, quota, bad key)
+        raise
+    await _store(db, place_id, payload)
+    await db.commit()
+    return payload
+
+async def warm_place_details(db: AsyncSession, limit: int | None = None, concurrency: int = 4, batch_size: int = 100) -> tuple[int, int]:
+    """
+    Fetches details for every place referenced by travel_records that is missing from the cache or stale,
+    `concurrency` upstream calls at a time, committing every `batch_size` places.
+    Returns (stored, failed).
+    """
+    cutoff = datetime.utcnow() - PLACE_DETAILS_MAX_AGE
+    statement = (
+        select(TravelRecord.place_external_id)
+        .outerjoin(PlaceDetailsCache, PlaceDetailsCache.place_external_id == TravelRecord.place_external_id)
+        .where(
+            TravelRecord.place_external_id.is_not(None),
+            or_(PlaceDetailsCache.place_external_id.is_(None), PlaceDetailsCache.fetched_at < cutoff),
+        )
+        .distinct()
+        .limit(limit)
+    )
+    place_ids = list(await db.scalars(statement))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    async def fetch(place_id: str) -> dict[str, Any] | None:
+        async with semaphore:
+            try:
+                return await place_details(place_id)
+            except PlacesError:
+                return None
+
+    stored = failed = 0
+    for start in range(0, len(place_ids), batch_size):
+        batch = place_ids[start:start + batch_size]
+        for place_id, payload in zip(batch, await asyncio.gather(*map(fetch, batch))):
+            if payload is None:
+                failed += 1
+                continue
+            await _store(db, place_id, payload)
+            stored += 1
+        await db.commit()
+    return stored, failed
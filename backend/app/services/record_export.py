@@ -0,0 +1,82 @@
+import csv, io, json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator
+from sqlalchemy import select
+from backend.app.db.session import AsyncSessionLocal
+from backend.app.models.travel_record import TravelRecord
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    TravelRecord.id, TravelRecord.title, TravelRecord.notes, TravelRecord.country_code, TravelRecord.city,
+    TravelRecord.latitude, TravelRecord.longitude, TravelRecord.destination_type, TravelRecord.rating,
+    TravelRecord.visited_at, TravelRecord.place_external_id, TravelRecord.created_at, TravelRecord.updated_at,
+]
+FIELDS = [c.key for c in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "geojson": "application/geo+json",
+}
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+def _ndjson(rows: list[dict]) -> str:
+    return "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+
+def _csv(rows: list[dict]) -> str:
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=FIELDS).writerows(rows)
+    return buf.getvalue()
+
+def _geojson(rows: list[dict], first: bool) -> str:
+    features = (
+        json.dumps({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [row["longitude"], row["latitude"]]},
+            "properties": {k: v for k, v in row.items() if k not in ("latitude", "longitude")},
+        }, separators=(",", ":"))
+        for row in rows
+    )
+    return ("" if first else ",") + ",".join(features)
+
+async def export_records(user_id: int, fmt: str) -> AsyncIterator[bytes]:
+    """
+    Streams every record of the user, EXPORT_BATCH_SIZE rows at a time, as one chunk per batch.
+    Opens its own session: the response body is produced after the request's dependencies have been torn down.
+    Plain column rows over a server-side cursor, so neither ORM objects nor the full result are ever held.
+    """
+    if fmt == "csv":
+        yield (",".join(FIELDS) + "\r\n").encode()
+    elif fmt == "geojson":
+        yield b'{"type":"FeatureCollection","features":['
+
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .where(TravelRecord.user_id == user_id)
+        .order_by(TravelRecord.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    first = True
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement)
+        async for partition in result.mappings().partitions():
+            rows = [{k: _plain(v) for k, v in row.items()} for row in partition]
+            if fmt == "csv":
+                chunk = _csv(rows)
+            elif fmt == "geojson":
+                chunk = _geojson(rows, first)
+            else:
+                chunk = _ndjson(rows)
+            first = False
+            yield chunk.encode()
+
+    if fmt == "geojson":
+        yield b"]}"
@@ -0,0 +1,95 @@
+import codecs, csv, json
+from itertools import islice
+from typing import IO, Any, Iterator
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.app.models.travel_record import TravelRecord
+from backend.app.schemas.travel_record import ImportReport, ImportRowError, TravelRecordCreate
+from backend.app.services.aggregation import apply_record_changes
+from backend.app.services.cache import bump_data_version
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+def _stopped(line_no: int, reason: str) -> ImportRowError:
+    return ImportRowError(line=line_no, error=f"{reason}; the rest of the file was not imported")
+
+def _text_lines(raw: IO[bytes]) -> Iterator[str]:
+    # Decoded line by line, so an invalid byte is reported on its own line and every line before it is used
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for line in raw:
+        yield decoder.decode(line)
+
+def _ndjson_rows(stream: Iterator[str]) -> Iterator[tuple[int, Any]]:
+    line_no = 0
+    try:
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+    except UnicodeDecodeError as e:
+        yield line_no + 1, _stopped(line_no + 1, f"not valid UTF-8: {e.reason}")
+
+def _csv_rows(stream: Iterator[str]) -> Iterator[tuple[int, Any]]:
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            # Empty cells mean "not set" for the optional columns
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in ("", None)}
+    except (UnicodeDecodeError, csv.Error) as e:
+        # line_num counts the lines fully parsed, so the failure is on the next one
+        reason = f"not valid UTF-8: {e.reason}" if isinstance(e, UnicodeDecodeError) else f"malformed CSV: {e}"
+        yield reader.line_num + 1, _stopped(reader.line_num + 1, reason)
+
+def _validate_batch(rows: Iterator[tuple[int, Any]], size: int) -> tuple[list[dict], list[ImportRowError]] | None:
+    """
+    Reads and validates the next `size` rows; None once the input is exhausted. Runs in the threadpool.
+    """
+    batch = list(islice(rows, size))
+    if not batch:
+        return None
+    valid, errors = [], []
+    for line_no, row in batch:
+        if isinstance(row, ImportRowError):
+            errors.append(row)
+            continue
+        if isinstance(row, Exception):
+            errors.append(ImportRowError(line=line_no, error=f"invalid JSON: {row}"))
+            continue
+        try:
+            valid.append(TravelRecordCreate.model_validate(row).model_dump())
+        except ValidationError as e:
+            first = e.errors()[0]
+            where = ".".join(str(p) for p in first["loc"])
+            errors.append(ImportRowError(line=line_no, error=f"{where}: {first['msg']}" if where else first["msg"]))
+    return valid, errors
+
+async def import_records(db: AsyncSession, user_id: int, raw: IO[bytes], fmt: str) -> ImportReport:
+    """
+    Streams NDJSON or CSV from `raw`, validating and inserting IMPORT_BATCH_SIZE rows per transaction,
+    so memory stays flat however large the file is. Batches already committed stay if a later one fails.
+    Input that cannot be decoded or tokenized ends the import at that line, reported as its last error.
+    """
+    stream = _text_lines(raw)
+    rows = _csv_rows(stream) if fmt == "csv" else _ndjson_rows(stream)
+    report = ImportReport(imported=0, failed=0, errors=[])
+
+    while (parsed := await run_in_threadpool(_validate_batch, rows, IMPORT_BATCH_SIZE)) is not None:
+        valid, errors = parsed
+        report.failed += len(errors)
+        report.errors.extend(errors[:MAX_REPORTED_ERRORS - len(report.errors)])
+        if not valid:
+            continue
+        # One multi-row INSERT ... RETURNING per batch (insertmanyvalues), no per-row refresh
+        statement = insert(TravelRecord).returning(TravelRecord.country_code, TravelRecord.rating, TravelRecord.visited_at)
+        added = [tuple(r) for r in await db.execute(statement, [{**r, "user_id": user_id} for r in valid])]
+        await db.run_sync(apply_record_changes, user_id, added=added)
+        await db.commit()
+        bump_data_version(user_id)
+        report.imported += len(added)
+    return report
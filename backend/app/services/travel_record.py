@@ -1,76 +1,359 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, select
+import base64, json, re
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, RowMapping, Select, delete, func, insert, literal_column, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql
 from backend.app.models.travel_record import TravelRecord
-from backend.app.schemas.travel_record import RecordFilters, TravelRecordCreate, TravelRecordUpdate
+from backend.app.schemas.photos import photo_payload
+from backend.app.schemas.travel_record import BatchSelection, BatchUpdate, RecordFilters, TravelRecordCreate, TravelRecordUpdate
+from backend.app.services.aggregation import RecordKey, apply_record_changes
+from backend.app.services.cache import TTLCache, bump_data_version, data_version
+from backend.app.services.photo_blob import release_refs
+from backend.app.services.geo import bbox_condition, bounding_box, haversine_km
 
-def create_record(db: Session, user_id: int, data: TravelRecordCreate) -> TravelRecord:
-    rec = TravelRecord(user_id=user_id, **data.model_dump()) # Auto convert into dict to avoid having to assign every field
-    db.add(rec)
-    db.commit()
-    db.refresh(rec)
+# Exact totals per (user, data version, filter set); a write bumps the version so stale counts are never read
+_count_cache = TTLCache(maxsize=4096, ttl=300)
+
+# Generated tsvector column (title > city > notes) with a GIN index, maintained by Postgres
+SEARCH_VECTOR = TravelRecord.search_vector
+# Inlined rather than bound so the statement can be rendered with literal binds for count_estimate()
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+def aggregate_key(rec: TravelRecord) -> RecordKey:
+    return (rec.country_code, rec.rating, rec.visited_at)
+
+# Writes are single INSERT/UPDATE/DELETE ... RETURNING statements scoped by user_id (no load-then-modify,
+# no refresh); the only extra statements are the summary-table maintenance in the same transaction.
+AGGREGATE_FIELDS = {"country_code", "rating", "visited_at"}
+NO_SYNC = {"synchronize_session": False}
+
+async def create_record(db: AsyncSession, user_id: int, data: TravelRecordCreate) -> TravelRecord:
+    statement = insert(TravelRecord).values(user_id=user_id, **data.model_dump()).returning(TravelRecord) # Auto convert into dict to avoid having to assign every field
+    rec = (await db.scalars(statement)).one()
+    await db.run_sync(apply_record_changes, user_id, added=[aggregate_key(rec)])
+    await db.commit()
+    bump_data_version(user_id)
     return rec
 
-def get_record(db: Session, user_id: int, record_id: int) -> TravelRecord | None:
+async def get_record(db: AsyncSession, user_id: int, record_id: int) -> TravelRecord | None:
     statement = (
         select(TravelRecord)
         .where(TravelRecord.id == record_id, TravelRecord.user_id == user_id)
         .limit(1)
     )
-    return db.execute(statement).scalars().first()
+    return (await db.scalars(statement)).first()
 
-def update_record(db: Session, user_id: int, record_id: int, data: TravelRecordUpdate) -> TravelRecord | None:
-    rec = get_record(db, user_id, record_id)
-    if not rec:
-        return None
+def _update_with_old_key(conditions: list[ColumnElement[bool]], updates: dict, *returning):
+    """
+    UPDATE ... FROM a snapshot of the matched rows, RETURNING `returning` followed by each row's old
+    aggregate key. Postgres evaluates the FROM subquery before applying the update; FOR UPDATE keeps a
+    concurrent write from slipping in between the snapshot and the update.
+    """
+    old = (
+        select(TravelRecord.id, TravelRecord.country_code, TravelRecord.rating, TravelRecord.visited_at)
+        .where(*conditions)
+        .with_for_update()
+        .subquery("old")
+    )
+    return (
+        update(TravelRecord)
+        .where(TravelRecord.id == old.c.id)
+        .values(**updates)
+        .returning(*returning, old.c.country_code, old.c.rating, old.c.visited_at)
+    )
+
+async def update_record(db: AsyncSession, user_id: int, record_id: int, data: TravelRecordUpdate) -> TravelRecord | None:
     updates = data.model_dump(exclude_unset=True, exclude_none=True) # Only includes the fields that user sends for update purposes
-    for k, v in updates.items():
-        setattr(rec, k, v)
-    db.commit()
-    db.refresh(rec)
+    if not updates:
+        return await get_record(db, user_id, record_id)
+    conditions = [TravelRecord.id == record_id, TravelRecord.user_id == user_id]
+    if updates.keys() & AGGREGATE_FIELDS:
+        row = (await db.execute(_update_with_old_key(conditions, updates, TravelRecord), execution_options=NO_SYNC)).first()
+        if not row:
+            return None
+        rec, before = row[0], tuple(row[1:])
+        if aggregate_key(rec) != before:
+            await db.run_sync(apply_record_changes, user_id, removed=[before], added=[aggregate_key(rec)])
+    else:
+        statement = update(TravelRecord).where(*conditions).values(**updates).returning(TravelRecord)
+        rec = (await db.scalars(statement, execution_options=NO_SYNC)).first()
+        if not rec:
+            return None
+    await db.commit()
+    bump_data_version(user_id)
     return rec
 
-def delete_record(db: Session, user_id: int, record_id: int) -> bool:
-    rec = get_record(db, user_id, record_id)
-    if not rec:
-        return False
-    db.delete(rec)
-    db.commit()
-    return True
+async def _delete_where(db: AsyncSession, user_id: int, conditions: list[ColumnElement[bool]]) -> int:
+    statement = (
+        delete(TravelRecord)
+        .where(*conditions)
+        .returning(TravelRecord.country_code, TravelRecord.rating, TravelRecord.visited_at, TravelRecord.photo_path)
+    )
+    rows = (await db.execute(statement, execution_options=NO_SYNC)).all()
+    if not rows:
+        return 0
+    await db.run_sync(apply_record_changes, user_id, removed=[tuple(r[:3]) for r in rows])
+    if any(r.photo_path for r in rows):
+        await db.run_sync(release_refs, [r.photo_path for r in rows])
+    await db.commit()
+    bump_data_version(user_id)
+    return len(rows)
+
+async def delete_record(db: AsyncSession, user_id: int, record_id: int) -> bool:
+    return await _delete_where(db, user_id, [TravelRecord.id == record_id, TravelRecord.user_id == user_id]) > 0
+
+def _selection_conditions(db: AsyncSession, user_id: int, selection: BatchSelection) -> list[ColumnElement[bool]]:
+    if selection.ids is not None:
+        return [TravelRecord.user_id == user_id, TravelRecord.id.in_(selection.ids)]
+    conditions, _, _ = filter_conditions(selection.filter, uses_full_text(db)) # type: ignore[arg-type]
+    return [TravelRecord.user_id == user_id, *conditions]
+
+async def batch_update(db: AsyncSession, user_id: int, data: BatchUpdate) -> int:
+    """
+    Applies one patch to every selected record in a single UPDATE ... RETURNING; returns the number updated.
+    """
+    updates = data.patch.model_dump(exclude_unset=True, exclude_none=True)
+    if not updates:
+        return 0
+    conditions = _selection_conditions(db, user_id, data)
+    if updates.keys() & AGGREGATE_FIELDS:
+        # Summary tables need each row's key before and after
+        statement = _update_with_old_key(conditions, updates, TravelRecord.country_code, TravelRecord.rating, TravelRecord.visited_at)
+        rows = (await db.execute(statement, execution_options=NO_SYNC)).all()
+        changed = [(tuple(r[3:]), tuple(r[:3])) for r in rows if tuple(r[:3]) != tuple(r[3:])]
+        if changed:
+            removed, added = zip(*changed)
+            await db.run_sync(apply_record_changes, user_id, removed=removed, added=added)
+    else:
+        statement = update(TravelRecord).where(*conditions).values(**updates).returning(TravelRecord.id)
+        rows = (await db.execute(statement, execution_options=NO_SYNC)).all()
+    await db.commit()
+    if rows:
+        bump_data_version(user_id)
+    return len(rows)
+
+async def batch_delete(db: AsyncSession, user_id: int, selection: BatchSelection) -> int:
+    """
+    Deletes every selected record in a single DELETE ... RETURNING; returns the number deleted.
+    """
+    return await _delete_where(db, user_id, _selection_conditions(db, user_id, selection))
+
+# Sortable columns, each backed by a (user_id, <column>, id) index so keyset pages stay cheap
+ORDERABLE = {
+    "visited_at": TravelRecord.visited_at,
+    "created_at": TravelRecord.created_at,
+    "rating": TravelRecord.rating,
+    "title": TravelRecord.title,
+}
+
+def parse_order_by(order_by: str | None) -> tuple[str, bool]:
+    """
+    Returns (field, descending). Unknown fields fall back to visited_at, direction defaults to desc.
+    "relevance" (with q) is always descending, "distance" (with near_*) always ascending.
+    """
+    field, _, direction = (order_by or "visited_at:desc").partition(":")
+    if field in ("relevance", "distance"):
+        return field, field == "relevance"
+    if field not in ORDERABLE:
+        field = "visited_at"
+    return field, direction.lower() != "asc"
+
+def to_prefix_tsquery(q: str) -> str | None:
+    """
+    "new yo" -> "new:* & yo:*" so every term matches as a prefix (search-as-you-type).
+    """
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        return None
+    return " & ".join(f"{t}:*" for t in terms)
+
+def encode_cursor(order_key: str, value, record_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([order_key, value, record_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, order_key: str) -> tuple[object, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, value, record_id = json.loads(raw)
+        if key.partition(":")[0] in ("visited_at", "created_at"):
+            value = datetime.fromisoformat(value)
+        record_id = int(record_id)
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("invalid_cursor")
+    if key != order_key:
+        raise ValueError("cursor_order_mismatch") # cursor was issued for a different order_by
+    return value, record_id
+
+async def _exact_count(db: AsyncSession, user_id: int, filters: RecordFilters, statement: Select) -> int:
+    filter_set = filters.model_dump(exclude={"order_by", "limit", "offset", "cursor", "with_total"}, exclude_none=True)
+    key = (user_id, data_version(user_id), tuple(sorted(filter_set.items())))
+    cached = _count_cache.get(key)
+    if cached is not None:
+        return cached
+    count = int(await db.scalar(select(func.count()).select_from(statement.subquery())) or 0)
+    _count_cache.set(key, count)
+    return count
 
-def search_records(db: Session, user_id: int, filters: RecordFilters) -> tuple[list[TravelRecord], int]:
-    statement = select(TravelRecord).where(TravelRecord.user_id == user_id)
+async def _estimated_count(db: AsyncSession, statement: Select) -> int:
+    """
+    Planner row estimate via the count_estimate() SQL function (EXPLAIN under the hood), no table scan.
+    """
+    sql = statement.compile(dialect=postgresql.dialect(paramstyle="named"), compile_kwargs={"literal_binds": True})
+    return int(await db.scalar(select(func.count_estimate(str(sql)))) or 0)
 
-    if filters.q:
+async def count_records(db: AsyncSession, user_id: int, filters: RecordFilters, statement: Select) -> int | None:
+    if filters.with_total == "false":
+        return None
+    if filters.with_total == "estimate" and db.get_bind().dialect.name == "postgresql":
+        return await _estimated_count(db, statement)
+    return await _exact_count(db, user_id, filters, statement)
+
+def filter_conditions(filters: RecordFilters, full_text: bool) -> tuple[list[ColumnElement[bool]], ColumnElement | None, ColumnElement | None]:
+    """
+    WHERE conditions for everything in `filters` except paging, plus the relevance rank (q with full-text search)
+    and distance (near_*) expressions for ordering. Shared by searches and batch updates/deletes.
+    """
+    conditions: list[ColumnElement[bool]] = []
+
+    rank = None
+    if filters.q and full_text:
+        tsquery = to_prefix_tsquery(filters.q)
+        if tsquery:
+            query = func.to_tsquery(SEARCH_CONFIG, tsquery)
+            conditions.append(SEARCH_VECTOR.op("@@")(query))
+            rank = func.ts_rank_cd(SEARCH_VECTOR, query)
+    elif filters.q:
+        # Unindexed fallback for databases without full-text search (e.g. SQLite)
         like = f"%{filters.q.lower()}%"
-        statement = statement.where(or_(
+        conditions.append(or_(
             func.lower(TravelRecord.title).like(like),
             func.lower(TravelRecord.notes).like(like),
             func.lower(TravelRecord.city).like(like),
         ))
 
     if filters.country_code:
-        statement = statement.where(TravelRecord.country_code == filters.country_code)
+        conditions.append(TravelRecord.country_code == filters.country_code)
     if filters.city:
-        statement = statement.where(TravelRecord.city == filters.city)
+        conditions.append(TravelRecord.city == filters.city)
     if filters.dest_type:
-        statement = statement.where(TravelRecord.destination_type == filters.dest_type)
+        conditions.append(TravelRecord.destination_type == filters.dest_type)
     if filters.rating_min is not None:
-        statement = statement.where(TravelRecord.rating >= filters.rating_min)
+        conditions.append(TravelRecord.rating >= filters.rating_min)
     if filters.rating_max is not None:
-        statement = statement.where(TravelRecord.rating <= filters.rating_max)
+        conditions.append(TravelRecord.rating <= filters.rating_max)
     if filters.date_from:
-        statement = statement.where(TravelRecord.visited_at >= filters.date_from)
+        conditions.append(TravelRecord.visited_at >= filters.date_from)
     if filters.date_to:
-        statement = statement.where(TravelRecord.visited_at <= filters.date_to)
+        conditions.append(TravelRecord.visited_at <= filters.date_to)
+
+    distance = None
+    near = (filters.near_lat, filters.near_lon, filters.near_km)
+    if any(v is not None for v in near):
+        if any(v is None for v in near):
+            raise ValueError("near_lat, near_lon and near_km must be given together")
+        lat, lon, km = near
+        # Indexed bounding-box prefilter on (user_id, latitude, longitude), then the exact great-circle check
+        conditions.append(bbox_condition(TravelRecord.latitude, TravelRecord.longitude, *bounding_box(lat, lon, km))) # type: ignore
+        distance = haversine_km(TravelRecord.latitude, TravelRecord.longitude, lat, lon) # type: ignore
+        conditions.append(distance <= km)
+
+    return conditions, rank, distance
+
+def uses_full_text(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+# List pages select plain column rows: no ORM objects, identity map or from_attributes validation per item
+PHOTO_COLUMNS = ("photo_path", "photo_content_type", "photo_size_bytes", "photo_status")
+# Generated columns (search_vector) only serve filters and are never part of a record
+RECORD_COLUMNS = [c for c in TravelRecord.__table__.c if c.computed is None]
+
+def read_columns(fields: tuple[str, ...] | None, *extra: str) -> list:
+    """
+    Columns needed to render `fields` of TravelRecordRead (all when None), plus id and any `extra` columns.
+    """
+    if fields is None:
+        return list(RECORD_COLUMNS)
+    names = {"id", *extra}
+    for f in fields:
+        if f == "photo":
+            names.update(PHOTO_COLUMNS)
+        else:
+            names.add(f)
+    return [c for c in RECORD_COLUMNS if c.key in names]
+
+def read_row(row: RowMapping, fields: tuple[str, ...] | None = None) -> dict:
+    """
+    The TravelRecordRead shape of a travel_records row (only id + `fields` when given), as a plain dict ready for JSON encoding.
+    """
+    item = {k: v for k, v in row.items() if k not in PHOTO_COLUMNS}
+    item["weather_summary"] = None
+    if "photo_path" in row:
+        item["photo"] = photo_payload(row["id"], *(row[c] for c in PHOTO_COLUMNS)) if row["photo_path"] else None
+    if fields is not None:
+        item = {k: item[k] for k in ("id", *fields)}
+    return item
+
+async def get_record_fields(db: AsyncSession, user_id: int, record_id: int, fields: tuple[str, ...]) -> dict | None:
+    statement = (
+        select(*read_columns(fields))
+        .where(TravelRecord.id == record_id, TravelRecord.user_id == user_id)
+        .limit(1)
+    )
+    row = (await db.execute(statement)).mappings().first()
+    return read_row(row, fields) if row else None
+
+async def search_records(
+    db: AsyncSession, user_id: int, filters: RecordFilters, fields: tuple[str, ...] | None = None,
+) -> tuple[list[dict], int | None, str | None]:
+    conditions, rank, distance = filter_conditions(filters, uses_full_text(db))
+
+    computed_orders = {
+        "relevance": rank.desc() if rank is not None else None,
+        "distance": distance.asc() if distance is not None else None,
+    }
+    field, descending = parse_order_by(filters.order_by)
+    order = computed_orders.get(field)
+    if field in computed_orders and order is None:
+        # relevance without q / distance without near_*: fall back before picking the columns to select
+        field, descending = "visited_at", True
+
+    # Only the requested columns (plus the effective sort column for the cursor), so unwanted notes never leave the database
+    columns = read_columns(fields, *(() if order is not None else (field,)))
+    statement = select(*columns).where(TravelRecord.user_id == user_id, *conditions)
+
+    row_count = await count_records(db, user_id, filters, statement)
+
+    if order is not None:
+        # Computed per query, so these orders use plain offsets and never hand out a cursor
+        statement = statement.order_by(order, TravelRecord.id.desc()).offset(filters.offset)
+        rows = (await db.execute(statement.limit(filters.limit))).mappings().all()
+        return [read_row(r, fields) for r in rows], row_count, None
+
+    order_key = f"{field}:{'desc' if descending else 'asc'}"
+    col = ORDERABLE[field]
+
+    # Keyset pagination: seek past the last (sort value, id) seen instead of OFFSET-scanning skipped rows
+    if filters.cursor:
+        value, last_id = decode_cursor(filters.cursor, order_key)
+        key = tuple_(col, TravelRecord.id)
+        statement = statement.where(key < tuple_(value, last_id) if descending else key > tuple_(value, last_id))
+    elif filters.offset:
+        statement = statement.offset(filters.offset)
 
-    field, _, direction = (filters.order_by or "visited_at:desc").partition(":")
-    col = getattr(TravelRecord, field, TravelRecord.visited_at)
-    statement = statement.order_by(col.asc() if direction.lower() == "asc" else col.desc())
+    if descending:
+        statement = statement.order_by(col.desc(), TravelRecord.id.desc())
+    else:
+        statement = statement.order_by(col.asc(), TravelRecord.id.asc())
 
-    count_query = select(func.count()).select_from(statement.order_by(None).subquery())
-    row_count = db.execute(count_query).scalar_one()
+    # Fetch one extra row to know whether there is a next page
+    rows = (await db.execute(statement.limit(filters.limit + 1))).mappings().all()
+    result_items = [read_row(r, fields) for r in rows[:filters.limit]]
 
-    results_query = statement.offset(filters.offset).limit(filters.limit)
-    result_items = db.execute(results_query).scalars().all()
+    next_cursor = None
+    if len(rows) > filters.limit:
+        last = rows[filters.limit - 1]
+        next_cursor = encode_cursor(order_key, last[field], last["id"])
 
-    return result_items, int(row_count) # type: ignore
\ No newline at end of file
+    return result_items, row_count, next_cursor
@@ -1,8 +1,8 @@
 import os
 from dotenv import load_dotenv
 
-def get_env(key: str) -> str:
-    value = os.getenv(key)
+def get_env(key: str, default: str | None = None) -> str:
+    value = os.getenv(key, default)
     if value is None:
         raise ValueError(f"{key} is not set in your environment!")
     return value
@@ -11,4 +11,10 @@ load_dotenv()
 
 DATABASE_URL = get_env("DATABASE_URL")
 JWT_SECRET = get_env("JWT_SECRET")
-GOOGLE_MAPS_API_KEY = get_env("GOOGLE_MAPS_API_KEY")
\ No newline at end of file
+GOOGLE_MAPS_API_KEY = get_env("GOOGLE_MAPS_API_KEY")
+# Point at a local stub server in tests
+GOOGLE_PLACES_BASE_URL = get_env("GOOGLE_PLACES_BASE_URL", "https://maps.googleapis.com/maps/api/place")
+# Needs the h2 package (pip install "httpx[http2]"); silently stays on HTTP/1.1 without it
+GOOGLE_PLACES_HTTP2 = get_env("GOOGLE_PLACES_HTTP2", "0") == "1"
+# Opt-in (tests/CI): fail requests that run more SQL statements than their declared query budget
+SQL_QUERY_BUDGET_STRICT = get_env("SQL_QUERY_BUDGET_STRICT", "0") == "1"
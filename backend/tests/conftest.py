@@ -0,0 +1,64 @@
+"""
+Tests run the app against a throwaway SQLite database (aiosqlite for the request handlers), or against
+TEST_DATABASE_URL when set (an empty Postgres database; its tables are created and dropped by the run).
+The environment is set before backend.env is imported.
+"""
+import os, tempfile
+
+_tmp = tempfile.mkdtemp(prefix="travel-journal-tests-")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("GOOGLE_MAPS_API_KEY", "test-key")
+# main.py mounts ./static (the built frontend)
+os.makedirs(os.path.join(_tmp, "static"), exist_ok=True)
+_cwd = os.getcwd()
+os.chdir(_tmp)
+
+import itertools
+import pytest
+from fastapi.testclient import TestClient
+from backend.app.db import instrumentation
+from backend.app.db.base import Base
+from backend.app.db.session import engine
+from backend.app.main import app
+from backend.app.models import aggregation, photo_blob, place, travel_record, user # noqa: F401  register tables
+os.chdir(_cwd)
+
+_emails = itertools.count()
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path, monkeypatch):
+    # Photo files land in a per-test directory (MEDIA_ROOT is relative to the working directory)
+    monkeypatch.chdir(tmp_path)
+
+@pytest.fixture
+def strict_budgets(monkeypatch):
+    monkeypatch.setattr(instrumentation, "SQL_QUERY_BUDGET_STRICT", True)
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture
+def auth_headers(client):
+    email = f"user{next(_emails)}@example.com"
+    client.post("/api/auth/signup", json={"name": "test", "email": email, "password": "pw"}).raise_for_status()
+    token = client.post("/api/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    # Loads the principal into its cache, so later requests only count their own statements
+    client.get("/api/aggregation/avg-rating-by-country", headers=headers).raise_for_status()
+    return headers
+
+def query_count(response) -> int:
+    """
+    Statements the request ran, from its Server-Timing header (db;...;desc="N queries").
+    """
+    timing = response.headers["server-timing"]
+    return int(timing.split('desc="', 1)[1].split(" ", 1)[0])
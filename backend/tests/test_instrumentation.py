@@ -0,0 +1,30 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.app.db.instrumentation import QueryStatsMiddleware, query_budget
+from backend.app.db.session import get_async_db
+from backend.tests.conftest import query_count
+
+def _app_with_three_queries() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/n-plus-one", dependencies=[Depends(query_budget(1))])
+    async def n_plus_one(db: AsyncSession = Depends(get_async_db)):
+        for _ in range(3):
+            await db.execute(select(1))
+        return {"ok": True}
+
+    return app
+
+def test_over_budget_fails_the_request_in_strict_mode(strict_budgets):
+    response = TestClient(_app_with_three_queries()).get("/n-plus-one")
+    assert response.status_code == 500
+    assert response.text == "GET /n-plus-one ran 3 queries, budget is 1"
+    assert query_count(response) == 3
+
+def test_over_budget_only_logs_by_default(caplog):
+    response = TestClient(_app_with_three_queries()).get("/n-plus-one")
+    assert response.status_code == 200
+    assert "ran 3 queries, budget is 1" in caplog.text
@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime
+import pytest
+from backend.app.db.session import AsyncSessionLocal
+from backend.app.models.place import PlaceDetailsCache
+from backend.app.services import places
+from backend.app.services.google_maps import PlacesError
+
+STALE = datetime.utcnow() - places.PLACE_DETAILS_MAX_AGE * 2
+
+async def _details_with_stale_row(place_id: str) -> dict:
+    async with AsyncSessionLocal() as db:
+        db.add(PlaceDetailsCache(place_external_id=place_id, payload={"name": "cached"}, fetched_at=STALE))
+        await db.commit()
+        return await places.cached_place_details(db, place_id)
+
+def test_stale_details_are_served_when_the_refetch_fails(monkeypatch):
+    async def rejected(place_id: str) -> dict:
+        raise PlacesError("Details failed: REQUEST_DENIED - The provided API key is invalid.")
+    monkeypatch.setattr(places, "place_details", rejected)
+    assert asyncio.run(_details_with_stale_row("stale-denied")) == {"name": "cached"}
+
+def test_refetch_errors_propagate_without_a_cached_row(monkeypatch):
+    async def rejected(place_id: str) -> dict:
+        raise PlacesError("Details failed: INVALID_REQUEST")
+    monkeypatch.setattr(places, "place_details", rejected)
+
+    async def details() -> dict:
+        async with AsyncSessionLocal() as db:
+            return await places.cached_place_details(db, "never-cached")
+    with pytest.raises(PlacesError):
+        asyncio.run(details())
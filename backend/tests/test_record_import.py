@@ -0,0 +1,31 @@
+import json
+
+ROW = dict(
+    title="Lisbon", country_code="PT", latitude=38.7, longitude=-9.1,
+    destination_type="city", rating=4, visited_at="2024-01-10T10:00:00",
+)
+CSV_HEADER = "title,country_code,latitude,longitude,destination_type,rating,visited_at\n"
+CSV_ROW = "Lisbon,PT,38.7,-9.1,city,4,2024-01-10T10:00:00\n"
+
+def _import(client, auth_headers, name: str, body: bytes) -> dict:
+    response = client.post("/api/travel_record/import", files={"file": (name, body)}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_invalid_utf8_stops_the_import_at_that_line(client, auth_headers):
+    body = (json.dumps(ROW) + "\n").encode() + b'{"title": "\xff"}\n' + (json.dumps(ROW) + "\n").encode()
+    report = _import(client, auth_headers, "records.ndjson", body)
+    assert report["imported"] == 1
+    assert report["failed"] == 1
+    [error] = report["errors"]
+    assert error["line"] == 2
+    assert error["error"].startswith("not valid UTF-8")
+
+def test_malformed_csv_stops_the_import_at_that_line(client, auth_headers):
+    oversized = "x" * 200_000 # beyond csv.field_size_limit()
+    body = (CSV_HEADER + CSV_ROW + f'"{oversized}",PT\n' + CSV_ROW).encode()
+    report = _import(client, auth_headers, "records.csv", body)
+    assert report["imported"] == 1
+    [error] = report["errors"]
+    assert error["line"] == 3
+    assert error["error"].startswith("malformed CSV: field larger than field limit")
@@ -0,0 +1,91 @@
+"""
+Statement counts of the write paths, checked against their query budgets (strict mode turns an overrun into a 500).
+Postgres runs one extra statement per touched month: the advisory lock taken before the best-of-month refresh.
+"""
+from datetime import datetime
+import pytest
+from sqlalchemy import update
+from backend.app.db import instrumentation
+from backend.app.db.instrumentation import QueryStats
+from backend.app.db.session import SessionLocal, engine
+from backend.app.models.travel_record import TravelRecord
+from backend.app.services.aggregation import apply_record_changes
+from backend.tests.conftest import query_count
+
+LOCK = 1 if engine.dialect.name == "postgresql" else 0
+
+# SQLite hands back the new values for UPDATE ... FROM (SELECT ...) RETURNING old.*, so the photo
+# routes never see the previous path there
+needs_postgres = pytest.mark.skipif(LOCK == 0, reason="UPDATE ... FROM snapshot returns new values on SQLite")
+
+RECORD = dict(
+    title="Lisbon", country_code="PT", latitude=38.7, longitude=-9.1,
+    destination_type="city", rating=4, visited_at="2024-01-10T10:00:00",
+)
+
+pytestmark = pytest.mark.usefixtures("strict_budgets")
+
+def _create(client, auth_headers, **overrides) -> dict:
+    response = client.post("/api/travel_record/", json={**RECORD, **overrides}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_create(client, auth_headers):
+    response = client.post("/api/travel_record/", json=RECORD, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    # insert, country upsert, best-of-month upsert
+    assert query_count(response) == 3 + LOCK
+
+def test_patch_without_aggregate_fields(client, auth_headers):
+    record = _create(client, auth_headers)
+    response = client.patch(f"/api/travel_record/{record['id']}", json={"title": "Porto"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert query_count(response) == 1
+
+def test_delete_last_record_of_month(client, auth_headers):
+    record = _create(client, auth_headers)
+    response = client.delete(f"/api/travel_record/{record['id']}", headers=auth_headers)
+    assert response.status_code == 204, response.text
+    # delete, country upsert, best-of-month upsert (nothing left), month row delete
+    assert query_count(response) == 4 + LOCK
+
+def test_upkeep_for_a_record_moved_to_another_country_and_month(client, auth_headers):
+    record = _create(client, auth_headers)
+    before = ("PT", 4, datetime(2024, 1, 10, 10))
+    after = ("JP", 5, datetime(2024, 2, 3, 9))
+    stats = QueryStats()
+    token = instrumentation._current.set(stats)
+    try:
+        with SessionLocal() as db:
+            db.execute(
+                update(TravelRecord)
+                .where(TravelRecord.id == record["id"])
+                .values(country_code=after[0], rating=after[1], visited_at=after[2])
+            )
+            apply_record_changes(db, record["user_id"], removed=[before], added=[after])
+            db.commit()
+    finally:
+        instrumentation._current.reset(token)
+    # update, one upsert for both countries, January emptied (upsert + delete), February upsert
+    assert stats.count == 5 + 2 * LOCK
+
+@needs_postgres
+def test_photo_upload_and_delete(client, auth_headers):
+    record = _create(client, auth_headers)
+    response = client.post(
+        f"/api/photos/records/{record['id']}/photo",
+        files={"file": ("a.png", _PNG, "image/png")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    # photo columns, new blob reference (the record had no previous photo to release)
+    assert query_count(response) == 2
+    response = client.delete(f"/api/photos/records/{record['id']}/photo", headers=auth_headers)
+    assert response.status_code == 204, response.text
+    # photo columns, blob reference release
+    assert query_count(response) == 2
+
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
@@ -0,0 +1,59 @@
+"""add aggregation summary tables
+
+Revision ID: 14ebd1eca9bc
+Revises: 32dc78514556
+Create Date: 2026-10-18 17:26:45.903318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '14ebd1eca9bc'
+down_revision: Union[str, Sequence[str], None] = '32dc78514556'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_country_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('country_code', sa.String(length=2), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'country_code')
+    )
+    op.create_table('user_month_top',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['record_id'], ['travel_records.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'month')
+    )
+
+    # Backfill, same as `python -m backend.app.commands.rebuild_aggregates`
+    op.execute("""
+    INSERT INTO user_country_stats (user_id, country_code, rating_sum, record_count)
+    SELECT user_id, country_code, sum(rating), count(id)
+    FROM travel_records
+    GROUP BY user_id, country_code
+    """)
+    op.execute("""
+    INSERT INTO user_month_top (user_id, month, record_id)
+    SELECT DISTINCT ON (user_id, date_trunc('month', visited_at))
+        user_id, date_trunc('month', visited_at)::date, id
+    FROM travel_records
+    ORDER BY user_id, date_trunc('month', visited_at), rating DESC, visited_at DESC, id DESC
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_month_top')
+    op.drop_table('user_country_stats')
@@ -0,0 +1,28 @@
+"""add photo_status to travel_records
+
+Revision ID: 1b4b87848266
+Revises: 14ebd1eca9bc
+Create Date: 2026-10-18 19:52:20.684413
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b4b87848266'
+down_revision: Union[str, Sequence[str], None] = '14ebd1eca9bc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('travel_records', sa.Column('photo_status', sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('travel_records', 'photo_status')
@@ -0,0 +1,28 @@
+"""add lat/lon index to travel_records
+
+Revision ID: 32dc78514556
+Revises: 4a9783a1eb71
+Create Date: 2026-10-18 15:08:03.550291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '32dc78514556'
+down_revision: Union[str, Sequence[str], None] = '4a9783a1eb71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_travel_records_user_lat_lon', 'travel_records', ['user_id', 'latitude', 'longitude'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_travel_records_user_lat_lon', table_name='travel_records')
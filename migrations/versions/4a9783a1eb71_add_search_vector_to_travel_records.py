@@ -0,0 +1,42 @@
+"""add full-text search vector to travel_records
+
+Revision ID: 4a9783a1eb71
+Revises: 901e4bda4404
+Create Date: 2026-10-18 13:41:52.116530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a9783a1eb71'
+down_revision: Union[str, Sequence[str], None] = '901e4bda4404'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 'simple' config: no stemming, so place names and prefixes match as typed
+    op.add_column('travel_records', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(city, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(notes, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_travel_records_search_vector', 'travel_records', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_travel_records_search_vector', table_name='travel_records', postgresql_using='gin')
+    op.drop_column('travel_records', 'search_vector')
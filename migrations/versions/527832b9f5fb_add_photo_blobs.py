@@ -0,0 +1,54 @@
+"""add photo_blobs
+
+Revision ID: 527832b9f5fb
+Revises: 1b4b87848266
+Create Date: 2026-10-18 20:31:07.118245
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '527832b9f5fb'
+down_revision: Union[str, Sequence[str], None] = '1b4b87848266'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'photo_blobs',
+        sa.Column('path', sa.String(length=512), nullable=False),
+        sa.Column('content_type', sa.String(length=64), nullable=True),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('orphaned_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('path'),
+    )
+    op.create_index(
+        'ix_photo_blobs_orphaned_at', 'photo_blobs', ['orphaned_at'],
+        unique=False, postgresql_where=sa.text('ref_count = 0'),
+    )
+    # Joins records to photo_blobs for usage reports
+    op.create_index('ix_travel_records_photo_path', 'travel_records', ['photo_path'], unique=False)
+    # Backfill from the records that reference photos today; untracked files are picked up by
+    # `python -m backend.app.commands.gc_photos --adopt-unreferenced`
+    op.execute("""
+        INSERT INTO photo_blobs (path, content_type, size_bytes, ref_count, created_at)
+        SELECT photo_path, max(photo_content_type), coalesce(max(photo_size_bytes), 0), count(*), now()
+        FROM travel_records
+        WHERE photo_path IS NOT NULL
+        GROUP BY photo_path
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_travel_records_photo_path', table_name='travel_records')
+    op.drop_index('ix_photo_blobs_orphaned_at', table_name='photo_blobs')
+    op.drop_table('photo_blobs')
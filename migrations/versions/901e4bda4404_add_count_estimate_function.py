@@ -0,0 +1,38 @@
+"""add count_estimate function
+
+Revision ID: 901e4bda4404
+Revises: 943ad9e619b4
+Create Date: 2026-10-18 11:24:37.802114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '901e4bda4404'
+down_revision: Union[str, Sequence[str], None] = '943ad9e619b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Returns the planner's row estimate for a query without executing it
+    op.execute("""
+    CREATE OR REPLACE FUNCTION count_estimate(query text) RETURNS bigint AS $$
+    DECLARE
+        plan jsonb;
+    BEGIN
+        EXECUTE 'EXPLAIN (FORMAT JSON) ' || query INTO plan;
+        RETURN (plan->0->'Plan'->>'Plan Rows')::bigint;
+    END;
+    $$ LANGUAGE plpgsql VOLATILE STRICT;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS count_estimate(text)")
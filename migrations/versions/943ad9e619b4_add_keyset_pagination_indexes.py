@@ -0,0 +1,34 @@
+"""add keyset pagination indexes to travel_records
+
+Revision ID: 943ad9e619b4
+Revises: cc7d6deacb38
+Create Date: 2026-10-18 10:02:11.412907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '943ad9e619b4'
+down_revision: Union[str, Sequence[str], None] = 'cc7d6deacb38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_travel_records_user_visited_at_id', 'travel_records', ['user_id', 'visited_at', 'id'], unique=False)
+    op.create_index('ix_travel_records_user_created_at_id', 'travel_records', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_travel_records_user_rating_id', 'travel_records', ['user_id', 'rating', 'id'], unique=False)
+    op.create_index('ix_travel_records_user_title_id', 'travel_records', ['user_id', 'title', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_travel_records_user_title_id', table_name='travel_records')
+    op.drop_index('ix_travel_records_user_rating_id', table_name='travel_records')
+    op.drop_index('ix_travel_records_user_created_at_id', table_name='travel_records')
+    op.drop_index('ix_travel_records_user_visited_at_id', table_name='travel_records')
@@ -0,0 +1,41 @@
+"""add map grid cells to travel_records
+
+Revision ID: c47291439855
+Revises: dd1e1326ff01
+Create Date: 2026-10-18 21:47:13.902416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47291439855'
+down_revision: Union[str, Sequence[str], None] = 'dd1e1326ff01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Spherical Mercator cell at zoom 16 (see services.geo.grid_xy); latitude clamped to the web-map range
+CLAMPED_LAT = "RADIANS(LEAST(GREATEST(latitude, -85.05112878), 85.05112878))"
+GRID_X = "LEAST(GREATEST(FLOOR((longitude + 180) / 360 * 65536), 0), 65535)::integer"
+GRID_Y = f"LEAST(GREATEST(FLOOR((1 - LN(TAN({CLAMPED_LAT}) + 1 / COS({CLAMPED_LAT})) / PI()) / 2 * 65536), 0), 65535)::integer"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('travel_records', sa.Column('grid_x', sa.Integer(), sa.Computed(GRID_X, persisted=True), nullable=True))
+    op.add_column('travel_records', sa.Column('grid_y', sa.Integer(), sa.Computed(GRID_Y, persisted=True), nullable=True))
+    # Cluster queries range-scan one user's cells; rating/visited_at let the best-record pick skip the heap
+    op.create_index(
+        'ix_travel_records_user_grid', 'travel_records', ['user_id', 'grid_x', 'grid_y'],
+        unique=False, postgresql_include=['rating', 'visited_at', 'latitude', 'longitude'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_travel_records_user_grid', table_name='travel_records')
+    op.drop_column('travel_records', 'grid_y')
+    op.drop_column('travel_records', 'grid_x')
@@ -0,0 +1,34 @@
+"""add place_details_cache
+
+Revision ID: dd1e1326ff01
+Revises: 527832b9f5fb
+Create Date: 2026-10-18 21:04:52.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dd1e1326ff01'
+down_revision: Union[str, Sequence[str], None] = '527832b9f5fb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'place_details_cache',
+        sa.Column('place_external_id', sa.String(length=128), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('place_external_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('place_details_cache')
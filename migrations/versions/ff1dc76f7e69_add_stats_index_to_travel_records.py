@@ -0,0 +1,32 @@
+"""add stats index to travel_records
+
+Revision ID: ff1dc76f7e69
+Revises: c47291439855
+Create Date: 2026-10-18 22:15:40.337102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ff1dc76f7e69'
+down_revision: Union[str, Sequence[str], None] = 'c47291439855'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every /api/aggregation/stats dimension and metric, so groupings are an index-only scan of one user's entries
+    op.create_index(
+        'ix_travel_records_user_stats', 'travel_records', ['user_id', 'country_code', 'visited_at'],
+        unique=False, postgresql_include=['rating', 'city', 'destination_type'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_travel_records_user_stats', table_name='travel_records')